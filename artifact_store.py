@@ -0,0 +1,178 @@
+import os
+import hashlib
+import sqlite3
+import time
+import zlib
+
+# SQLite file holding extracted texts and summaries, keyed by the PDF's SHA-256
+# and the parameters of the stage that produced them.
+ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", os.path.join(os.getcwd(), "artifacts.sqlite3"))
+
+# Set ARTIFACT_STORE_ENABLED=false to always re-run extraction and summarization.
+ARTIFACT_STORE_ENABLED = os.getenv("ARTIFACT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    content BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (sha256, kind, params)
+);
+"""
+
+
+class ArtifactStore:
+    """
+    Persistent store of pipeline artifacts (extracted text, summaries).
+
+    Artifacts are zlib-compressed and addressed by (PDF SHA-256, kind, params), so a
+    bulletin re-processed with the same parameters skips the stages already done,
+    while a parameter change (e.g. SENTENCES_COUNT) only re-runs the affected stage.
+    A new connection is opened per operation, so the store can be shared by threads
+    and by the batch worker processes.
+    """
+
+    def __init__(self, path=ARTIFACT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def file_sha256(self, file_path):
+        """
+        Returns the SHA-256 of `file_path`. The file is only re-hashed when its
+        mtime or size differ from the last time it was seen.
+        """
+        abs_path = os.path.abspath(file_path)
+        st = os.stat(abs_path)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sha256 FROM file_hashes WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (abs_path, st.st_mtime_ns, st.st_size),
+            ).fetchone()
+        if row:
+            return row[0]
+
+        digest = hashlib.sha256()
+        with open(abs_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)",
+                (abs_path, st.st_mtime_ns, st.st_size, sha256),
+            )
+        return sha256
+
+    def get(self, sha256, kind, params):
+        """Returns the stored text artifact, or None if this stage hasn't run with these params."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content FROM artifacts WHERE sha256 = ? AND kind = ? AND params = ?",
+                (sha256, kind, params),
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def put(self, sha256, kind, params, text):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (sha256, kind, params, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, kind, params, zlib.compress(text.encode("utf-8")), time.time()),
+            )
+
+
+_store = None
+
+
+def get_artifact_store():
+    """Returns the shared ArtifactStore, or None when the store is disabled or unusable."""
+    global _store
+    if not ARTIFACT_STORE_ENABLED:
+        return None
+    if _store is None:
+        try:
+            _store = ArtifactStore()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: artifact store unavailable at {ARTIFACT_STORE_PATH}: {e}")
+            return None
+    return _store
+
+
+def extract_text_cached(pdf_filepath, workers=None):
+    """
+    extract_text_from_pdf backed by the artifact store.
+
+    Returns:
+        tuple: (pdf_sha256 or None, extracted text or None)
+    """
+    from pdf_processor import extract_text_from_pdf, extraction_params
+
+    store = get_artifact_store()
+    sha256 = None
+    if store is not None and os.path.exists(pdf_filepath):
+        try:
+            sha256 = store.file_sha256(pdf_filepath)
+            cached = store.get(sha256, "text", extraction_params())
+            if cached is not None:
+                print(f"Extracted text loaded from the artifact store (Length: {len(cached)}).")
+                return sha256, cached
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: artifact store lookup failed, extracting again: {e}")
+            sha256 = None
+
+    text = extract_text_from_pdf(pdf_filepath, workers)
+    if text and sha256:
+        try:
+            store.put(sha256, "text", extraction_params(), text)
+        except sqlite3.Error as e:
+            print(f"Warning: could not save extracted text to the artifact store: {e}")
+    return sha256, text
+
+
+def summarize_cached(pdf_sha256, text):
+    """
+    summarize backed by the artifact store; fallbacks to the original text are not stored.
+    Structured extractions are summarized section by section when SUMMARY_PER_SECTION is set.
+    """
+    from pdf_processor import PDF_EXTRACT_MODE, extraction_params
+    from summarize_text import summarize, summarize_by_section, summary_params, SUMMARY_PER_SECTION
+
+    params = summary_params()
+    summarize_fn = summarize
+    if PDF_EXTRACT_MODE == "structured":
+        # The summary input differs per extraction mode, so the mode is part of the key.
+        params = f"{params}|{extraction_params()}"
+        if SUMMARY_PER_SECTION:
+            summarize_fn = summarize_by_section
+
+    store = get_artifact_store()
+    if store is not None and pdf_sha256:
+        try:
+            cached = store.get(pdf_sha256, "summary", params)
+            if cached is not None:
+                print(f"Summary loaded from the artifact store (length: {len(cached)} chars).")
+                return cached
+        except sqlite3.Error as e:
+            print(f"Warning: artifact store lookup failed, summarizing again: {e}")
+
+    summary = summarize_fn(text)
+    if store is not None and pdf_sha256 and summary and summary is not text:
+        try:
+            store.put(pdf_sha256, "summary", params, summary)
+        except sqlite3.Error as e:
+            print(f"Warning: could not save summary to the artifact store: {e}")
+    return summary
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import json
+import threading
+import uuid
+
+# Directory where synthesized audio chunks are persisted between runs.
+# Defaults to a folder next to the working directory (i.e. /app inside the Docker image).
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.getcwd(), "tts_cache"))
+
+# Upper bound for the cache size on disk; least recently used chunks are evicted beyond it.
+# When unset (0) it depends on what the chunks are stored as (see cache_max_bytes).
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", "0"))
+
+# Default limit for compressed chunks (MP3/OGG_OPUS). The re-encoding audio profiles cache
+# the PCM (LINEAR16) chunks they get from the API, about 12 times larger than Google's
+# 32 kbit/s MP3 at the same sample rate, so their default is scaled to hold as many chunks.
+_DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+_PCM_SIZE_FACTOR = 12
+
+
+def cache_max_bytes(audio_encoding):
+    """TTS_CACHE_MAX_BYTES, or the default limit for chunks stored as `audio_encoding`."""
+    if TTS_CACHE_MAX_BYTES > 0:
+        return TTS_CACHE_MAX_BYTES
+    return _DEFAULT_MAX_BYTES * (_PCM_SIZE_FACTOR if audio_encoding == "LINEAR16" else 1)
+
+# Set TTS_CACHE_ENABLED=false to always call the TTS API.
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def make_cache_key(content, is_ssml, lang_code, voice_name, audio_encoding, audio_params=""):
+    """
+    Builds the content-addressed key for one synthesized chunk. `audio_params` describes
+    any other AudioConfig setting (speaking rate, sample rate, effects profile); when
+    empty the key is the same as for the default settings.
+    """
+    parts = [content, bool(is_ssml), lang_code, voice_name, str(audio_encoding)]
+    if audio_params:
+        parts.append(audio_params)
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Persistent, size-bounded LRU cache of synthesized audio chunks.
+
+    Each entry is a file named after its key; the file mtime is refreshed on
+    every hit and used as the recency marker for eviction. Safe to share between
+    the TTS worker threads.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes or cache_max_bytes("MP3")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None  # Computed lazily on the first write.
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".bin")
+
+    def get(self, key):
+        """Returns the cached audio bytes for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Stores `data` under `key`, evicting old entries if the cache grows too large."""
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Warning: could not write audio chunk to cache at {path}: {e}")
+            return
+        with self._lock:
+            # Rewriting an existing key (e.g. two runs synthesizing the same chunk) replaces
+            # its file, so only the size difference is added.
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            try:
+                os.replace(tmp_path, path)  # Atomic, so concurrent readers never see partial files.
+            except OSError as e:
+                print(f"Warning: could not write audio chunk to cache at {path}: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Trim to 90% of the limit so we don't rescan the directory on every write.
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def stats(self):
+        """Returns hit/miss counters for reporting."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,227 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from main import get_bulletin_number_from_filepath, check_slack_token, publish_audio
+from artifact_store import extract_text_cached, summarize_cached
+from tts_budget import apply_tts_budget
+from text_to_speech import convert_text_to_speech
+from publish_ledger import claim_bulletin, record_stage, record_result
+from workspace import JobWorkspace, exit_on_sigterm
+
+# Where the batch manifest is kept; the per-bulletin audio lives in a private job workspace.
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", os.path.join(os.getcwd(), "batch_output"))
+DEFAULT_MANIFEST_PATH = os.path.join(BATCH_OUTPUT_DIR, "manifest.json")
+
+
+class Manifest:
+    """
+    JSON record of every file's batch status, rewritten atomically after each update
+    so a crashed or interrupted batch can be resumed, skipping files already done.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_done(self, pdf_filepath):
+        return self.entries.get(pdf_filepath, {}).get("status") == "done"
+
+    def update(self, pdf_filepath, status, stage, error=None):
+        with self._lock:
+            self.entries[pdf_filepath] = {
+                "status": status,
+                "stage": stage,
+                "error": error,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def collect_pdf_files(target):
+    """Expands a directory, a glob pattern or a single file into a sorted list of PDF paths."""
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "*.pdf")) + glob.glob(os.path.join(target, "*.PDF"))
+    else:
+        paths = glob.glob(target)
+    return sorted({os.path.abspath(p) for p in paths if p.lower().endswith(".pdf") and os.path.isfile(p)})
+
+
+def extract_and_summarize(pdf_filepath):
+    """CPU-bound stage, run in a worker process: PDF extraction followed by summarization."""
+    # The batch already runs one process per file, so each file is extracted in-process.
+    pdf_sha256, extracted_text = extract_text_cached(pdf_filepath, workers=1)
+    if not extracted_text:
+        return None
+    budget = apply_tts_budget(summarize_cached(pdf_sha256, extracted_text), extracted_text)
+    if budget.path != "summary":
+        print(f"{os.path.basename(pdf_filepath)}: using {budget.path} ({budget.reason})")
+    return budget.text
+
+
+def synthesize_and_publish(pdf_filepath, summary_text, claim=None):
+    """
+    I/O-bound stage, run in a thread: TTS and Slack upload (skipping the channels
+    `claim`'s bulletin already reached, see main.publish_audio).
+
+    Returns:
+        tuple: (success, failed_stage, error_message, slack_file_ids)
+    """
+    bulletin_number = get_bulletin_number_from_filepath(pdf_filepath)
+    base_name = os.path.splitext(os.path.basename(pdf_filepath))[0]
+
+    with JobWorkspace(base_name) as workspace:
+        audio_filepath = convert_text_to_speech(
+            summary_text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E', output_path=workspace.file(f"{base_name}.mp3")
+        )
+        if not audio_filepath:
+            return False, "tts", "Failed to generate the audio file.", []
+        results = publish_audio(claim, audio_filepath, bulletin_number)
+    slack_file_ids = sorted({result.file_id for result in results if result.file_id})
+    errors = "; ".join(f"{r.target.channel}: {r.error}" for r in results if not r.ok)
+    if not results or errors:
+        return False, "slack", errors or "Failed to send to Slack.", slack_file_ids
+    return True, None, None, slack_file_ids
+
+
+def run_batch(pdf_files, manifest, cpu_workers=None, io_workers=4, force=False):
+    """
+    Processes `pdf_files` with a process pool for extraction/summarization and a
+    thread pool for TTS/Slack, so CPU work on one bulletin overlaps network work on
+    others. Files already marked as done in `manifest`, or already published / being
+    processed elsewhere according to the publish ledger, are skipped unless `force`.
+
+    Each file is claimed in the ledger only when its extraction is submitted (at most
+    two per CPU worker ahead). When the batch stops early (crash, Ctrl+C, SIGTERM),
+    uploads that did finish are still recorded and only the claims of unfinished files
+    are released as failed, so a rerun picks up exactly those.
+
+    Returns:
+        dict: Counts of "done", "failed" and "skipped" files.
+    """
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    pending = []
+    for pdf_filepath in pdf_files:
+        if manifest.is_done(pdf_filepath) and not force:
+            print(f"Skipping (already done): {pdf_filepath}")
+            counts["skipped"] += 1
+            continue
+        pending.append(pdf_filepath)
+
+    claims = {}  # Ledger claims held by this batch, until the file's result is recorded.
+    io_futures = {}
+    to_submit = deque(pending)
+    window = 2 * (cpu_workers or os.cpu_count() or 1)
+
+    def record(pdf_filepath, success, stage, error, slack_file_ids=None):
+        manifest.update(pdf_filepath, "done" if success else "failed", stage or "slack", error)
+        record_result(claims.pop(pdf_filepath), success, stage or "slack", error, slack_file_ids)
+        counts["done" if success else "failed"] += 1
+        label = "OK" if success else f"FAILED at {stage}: {error}"
+        print(f"[{counts['done'] + counts['failed']}/{len(pending)}] {os.path.basename(pdf_filepath)}: {label}")
+
+    def record_publish(pdf_filepath, future):
+        try:
+            success, stage, error, slack_file_ids = future.result()
+        except Exception as e:
+            success, stage, error, slack_file_ids = False, "tts", str(e), None
+        record(pdf_filepath, success, stage, error, slack_file_ids)
+
+    def submit_next(cpu_pool, cpu_futures):
+        while to_submit:
+            pdf_filepath = to_submit.popleft()
+            claim = claim_bulletin(pdf_filepath, get_bulletin_number_from_filepath(pdf_filepath), force=force)
+            if claim is not None and not claim.acquired:
+                print(f"Skipping (publish ledger: {claim.previous_status}): {pdf_filepath}")
+                counts["skipped"] += 1
+                continue
+            claims[pdf_filepath] = claim
+            record_stage(claim, "extract")
+            cpu_futures[cpu_pool.submit(extract_and_summarize, pdf_filepath)] = pdf_filepath
+            return
+
+    try:
+        with ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+            cpu_futures = {}
+            while to_submit or cpu_futures or io_futures:
+                while to_submit and len(cpu_futures) < window:
+                    submit_next(cpu_pool, cpu_futures)
+                if not cpu_futures and not io_futures:
+                    break
+                # Uploads are recorded as soon as they finish, so the manifest and the ledger
+                # stay current while other files are still being extracted.
+                done, _ = wait([*cpu_futures, *io_futures], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in io_futures:
+                        record_publish(io_futures.pop(future), future)
+                        continue
+                    pdf_filepath = cpu_futures.pop(future)
+                    try:
+                        summary_text = future.result()
+                    except Exception as e:
+                        record(pdf_filepath, False, "extract", str(e))
+                        continue
+                    if not summary_text:
+                        record(pdf_filepath, False, "extract", "No text could be extracted from the PDF.")
+                        continue
+                    manifest.update(pdf_filepath, "running", "tts")
+                    record_stage(claims[pdf_filepath], "tts")
+                    io_futures[io_pool.submit(synthesize_and_publish, pdf_filepath, summary_text, claims[pdf_filepath])] = pdf_filepath
+    finally:
+        # Leaving the pools waits for uploads already started; record those before
+        # releasing the remaining claims, so a rerun does not publish them again.
+        for future, pdf_filepath in io_futures.items():
+            if future.done() and not future.cancelled():
+                record_publish(pdf_filepath, future)
+        for claim in claims.values():
+            record_result(claim, False, error="Batch interrupted before this bulletin finished.")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processa um diretório (ou glob) de boletins em PDF em lote.")
+    parser.add_argument("target", help="Diretório com PDFs ou padrão glob (ex.: '/dados/boletins/B24-*.pdf').")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH,
+                        help="Arquivo JSON com o progresso do lote (permite retomar após falhas).")
+    parser.add_argument("--cpu-workers", type=int, default=None,
+                        help="Processos para extração/sumarização (padrão: número de núcleos).")
+    parser.add_argument("--io-workers", type=int, default=4,
+                        help="Threads para TTS e envio ao Slack.")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocessa e publica também os boletins já concluídos (manifesto e registro de publicações).")
+    args = parser.parse_args()
+    exit_on_sigterm()
+
+    print("--- Iniciando Open Insurance Slack Bot (modo lote) ---")
+    if not check_slack_token():
+        sys.exit(1)
+
+    pdf_files = collect_pdf_files(args.target)
+    if not pdf_files:
+        print(f"Erro: Nenhum PDF encontrado em '{args.target}'. Saindo.")
+        sys.exit(1)
+    print(f"{len(pdf_files)} PDFs encontrados. Manifesto: {args.manifest}")
+
+    counts = run_batch(pdf_files, Manifest(args.manifest), args.cpu_workers, args.io_workers, force=args.force)
+    print(f"\n--- Lote concluído: {counts['done']} ok, {counts['failed']} falhas, {counts['skipped']} ignorados ---")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import random
+
+import fitz # PyMuPDF
+
+# Vocabulary in the register of the SUSEP/Open Insurance bulletins, so tokenization,
+# stemming and TTS chunking see realistic word and sentence lengths.
+_WORDS = (
+    "open insurance seguradoras participantes consentimento compartilhamento dados cadastrais "
+    "apólices sinistros previdência capitalização cronograma implementação fase APIs padrões "
+    "segurança experiência usuário portal desenvolvedor SUSEP CNSP regulamentação prazo "
+    "homologação certificação diretório monitoramento disponibilidade desempenho incidentes "
+    "conformidade governança estrutura inicial convênio comitê técnico grupo trabalho"
+).split()
+
+
+def synthetic_sentence(rng, min_words=8, max_words=28):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_text(sentence_count, seed=0):
+    rng = random.Random(seed)
+    return " ".join(synthetic_sentence(rng) for _ in range(sentence_count))
+
+
+def generate_pdf(path, pages, seed=0, sentences_per_page=25):
+    """
+    Writes a synthetic bulletin PDF with `pages` pages. Every page carries the same
+    header and a numbered footer, like the real bulletins, plus a section heading
+    every few pages.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 40), "Boletim Open Insurance - SUSEP", fontsize=9)
+        y = 80
+        if page_number % 5 == 1:
+            page.insert_text((72, y), f"{page_number // 5 + 1}. SEÇÃO {page_number // 5 + 1}", fontsize=14)
+            y += 30
+        body = " ".join(synthetic_sentence(rng) for _ in range(sentences_per_page))
+        page.insert_textbox(fitz.Rect(72, y, 540, 760), body, fontsize=10)
+        page.insert_text((290, 810), f"Página {page_number} de {pages}", fontsize=8)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def generate_corpus(directory, page_counts=(1, 10, 50, 200), seed=0):
+    """Generates one PDF per page count in `directory` and returns {page_count: path}."""
+    os.makedirs(directory, exist_ok=True)
+    return {
+        pages: generate_pdf(os.path.join(directory, f"B99-{pages:03d}.pdf"), pages, seed=seed + pages)
+        for pages in page_counts
+    }
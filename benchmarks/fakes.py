@@ -0,0 +1,253 @@
+import io
+import json
+import random
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from google.api_core import exceptions as google_exceptions
+
+# One MPEG-2 Layer III frame header (24 kHz, 32 kbps, mono) padded to the frame size.
+# The bytes are never decoded, so only the size per frame matters.
+_MP3_FRAME = b"\xff\xf3\x44\xc4" + b"\x00" * 92
+_MP3_FRAMES_PER_CHAR = 2.5  # ~15 spoken chars/s at ~38 frames/s
+
+
+class FakeTextToSpeechClient:
+    """
+    Local stand-in for texttospeech.TextToSpeechClient.
+
+    Each call sleeps for `latency` (+/- `jitter`) seconds and then either fails with the
+    same google.api_core exceptions the real client raises (RESOURCE_EXHAUSTED at
+    `ratelimit_rate`, UNAVAILABLE at `error_rate`) or returns synthetic audio whose size
+    grows with the input text.
+    """
+
+    def __init__(self, latency=0.1, jitter=0.02, error_rate=0.0, ratelimit_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.ratelimit_rate = ratelimit_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, request, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if roll < self.ratelimit_rate:
+            raise google_exceptions.ResourceExhausted("Fake quota exceeded")
+        if roll < self.ratelimit_rate + self.error_rate:
+            raise google_exceptions.ServiceUnavailable("Fake backend unavailable")
+
+        synthesis_input = request["input"]
+        text = synthesis_input.text or synthesis_input.ssml
+        encoding = getattr(request["audio_config"].audio_encoding, "name", "MP3")
+        return SimpleNamespace(audio_content=fake_audio(len(text), encoding))
+
+
+def fake_audio(char_count, encoding="MP3"):
+    """Synthetic audio content roughly as long as `char_count` spoken characters."""
+    if encoding == "LINEAR16":
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(24000)
+            wav.writeframes(b"\x00\x00" * int(24000 * char_count / 15))
+        return buffer.getvalue()
+    return _MP3_FRAME * max(1, int(char_count * _MP3_FRAMES_PER_CHAR))
+
+
+class FakeSlackServer:
+    """
+    Local HTTP stand-in for the Slack Web API, for use with WebClient(base_url=server.base_url).
+
+    Implements the methods the bot uses (auth.test, conversations.list with cursor
+    pagination, files.getUploadURLExternal + upload URL + files.completeUploadExternal,
+    files.info, chat.postMessage), plus downloads of files registered with add_file().
+    Every request waits `latency` seconds; a fraction
+    `ratelimit_rate` gets HTTP 429 with a Retry-After header and `error_rate` gets HTTP 500.
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.0, ratelimit_rate=0.0, retry_after=1,
+                 channel_count=500, target_channel="podcastopin", page_size_cap=200, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.ratelimit_rate = ratelimit_rate
+        self.retry_after = retry_after
+        self.page_size_cap = page_size_cap
+        # The target channel is the last one, so name lookups have to walk every page.
+        self.channels = [{"id": f"C{i:08d}", "name": f"canal-{i}"} for i in range(channel_count - 1)]
+        self.channels.append({"id": "CTARGET0001", "name": target_channel})
+        self.calls = {}
+        self.uploaded_bytes = 0
+        self.files = {}
+        self.file_contents = {}
+        self.messages = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"{self.url}/api/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_file(self, name, content, mimetype="application/pdf"):
+        """Registers a file as if a user had shared it; returns its Slack file object."""
+        file_id = f"F{uuid.uuid4().hex[:10].upper()}"
+        file_info = {"id": file_id, "name": name, "mimetype": mimetype, "size": len(content),
+                     "url_private_download": f"{self.url}/files-pri/{file_id}/{name}"}
+        with self._lock:
+            self.files[file_id] = file_info
+            self.file_contents[file_id] = content
+        return file_info
+
+    def _record(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            return self._rng.random()
+
+    def _known_channel(self, channel_id):
+        # Direct messages (D...) and IDs the test made up are accepted; only C IDs that
+        # look like the fake's own channels but don't exist are rejected.
+        return not (channel_id or "").startswith("C0") or any(c["id"] == channel_id for c in self.channels)
+
+    def _api(self, method, params):
+        if method == "auth.test":
+            return {"ok": True, "team_id": "TFAKE0001", "user_id": "UFAKEBOT1"}
+        if method == "conversations.list":
+            start = int(params.get("cursor") or 0)
+            limit = min(int(params.get("limit") or 100), self.page_size_cap)
+            page = self.channels[start:start + limit]
+            next_cursor = str(start + limit) if start + limit < len(self.channels) else ""
+            return {"ok": True, "channels": page, "response_metadata": {"next_cursor": next_cursor}}
+        if method == "files.getUploadURLExternal":
+            file_id = f"F{uuid.uuid4().hex[:10].upper()}"
+            with self._lock:
+                self.files[file_id] = {"id": file_id, "name": params.get("filename"), "size": 0,
+                                       "permalink": f"{self.url}/files/{file_id}"}
+            return {"ok": True, "file_id": file_id, "upload_url": f"{self.url}/upload/{file_id}"}
+        if method == "files.completeUploadExternal":
+            files = json.loads(params.get("files") or "[]")
+            shared_to = [c for c in (params.get("channels") or params.get("channel_id") or "").split(",") if c]
+            if not all(self._known_channel(c) for c in shared_to):
+                return {"ok": False, "error": "channel_not_found"}
+            with self._lock:
+                for f in files:
+                    self.files.setdefault(f["id"], {"id": f["id"]}).update(title=f.get("title"), shared_to=shared_to)
+                    for channel in shared_to:
+                        self.messages.append({"channel": channel, "file": f["id"],
+                                              "text": params.get("initial_comment"),
+                                              "thread_ts": params.get("thread_ts")})
+                return {"ok": True, "files": [self.files[f["id"]] for f in files]}
+        if method == "files.info":
+            file_info = self.files.get(params.get("file"))
+            return {"ok": True, "file": file_info} if file_info else {"ok": False, "error": "file_not_found"}
+        if method == "chat.postMessage":
+            if not self._known_channel(params.get("channel")):
+                return {"ok": False, "error": "channel_not_found"}
+            ts = f"{time.time():.6f}"
+            with self._lock:
+                self.messages.append({"channel": params.get("channel"), "text": params.get("text"),
+                                      "thread_ts": params.get("thread_ts"), "ts": ts})
+            return {"ok": True, "channel": params.get("channel"), "ts": ts}
+        return {"ok": False, "error": "unknown_method"}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/files-pri/"):
+                    file_id = self.path.split("/")[2]
+                    server._record("download")
+                    content = server.file_contents.get(file_id)
+                    if content is None or self.headers.get("Authorization", "")[:7] != "Bearer ":
+                        self.send_response(404)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                    return
+                self.do_POST()
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                method = parsed.path.rsplit("/", 1)[-1]
+                roll = server._record(method)
+                time.sleep(server.latency)
+
+                if parsed.path.startswith("/upload/"):
+                    with server._lock:
+                        server.uploaded_bytes += len(body)
+                        if method in server.files:
+                            server.files[method]["size"] = len(body)
+                    self.send_response(200)
+                    self.send_header("Content-Length", "2")
+                    self.end_headers()
+                    self.wfile.write(b"OK")
+                    return
+
+                if roll < server.ratelimit_rate:
+                    self._send(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(server.retry_after)})
+                    return
+                if roll < server.ratelimit_rate + server.error_rate:
+                    self._send(500, {"ok": False, "error": "internal_error"})
+                    return
+
+                params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                content_type = self.headers.get("Content-Type", "")
+                if "application/json" in content_type and body:
+                    params.update(json.loads(body))
+                elif body:
+                    params.update({k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()})
+                self._send(200, server._api(method, params))
+
+        return Handler
@@ -0,0 +1,232 @@
+"""
+Offline benchmark suite for the bulletin pipeline.
+
+Runs every stage against synthetic PDFs and local stand-ins for Google TTS and
+Slack (benchmarks/fakes.py), so no credentials or network access are needed, and
+saves the results as JSON that can be compared between commits:
+
+    python -m benchmarks.run --output benchmarks/results/base.json
+    python -m benchmarks.run --compare benchmarks/results/base.json
+"""
+import os
+import tempfile
+
+# Isolate the benchmark from any local state before the pipeline modules read their config.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="opin_bench_")
+os.environ["TTS_CACHE_ENABLED"] = "false"
+os.environ["ARTIFACT_STORE_ENABLED"] = "false"
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+os.environ["SLACK_CHANNEL_CACHE_PATH"] = os.path.join(_SCRATCH_DIR, "channel_cache.json")
+os.environ.setdefault("RETRY_BASE_DELAY", "0.05")
+
+import argparse
+import json
+import platform
+import re
+import shutil
+import statistics
+import sys
+import threading
+import time
+
+from slack_sdk import WebClient
+
+from benchmarks.corpus import generate_corpus, synthetic_text
+from benchmarks.fakes import FakeSlackServer, FakeTextToSpeechClient, fake_audio
+import pdf_processor
+import slack_sender
+import summarize_text
+import text_to_speech
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _timed(fn, repeat):
+    """Runs `fn` `repeat` times and returns (median seconds, last result)."""
+    durations, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+
+def scenario_extraction(corpus, repeat):
+    results = []
+    for pages, path in sorted(corpus.items()):
+        for workers in sorted({1, pdf_processor.PDF_EXTRACT_WORKERS}):
+            seconds, text = _timed(lambda: pdf_processor.extract_text_from_pdf(path, workers), repeat)
+            results.append({"name": "extraction", "params": {"pages": pages, "workers": workers},
+                            "seconds": seconds, "pages_per_second": pages / seconds, "chars": len(text or "")})
+    return results
+
+
+def scenario_summarization(sentence_counts, repeat):
+    results = []
+    for sentences in sentence_counts:
+        text = synthetic_text(sentences, seed=sentences)
+        for algorithm in ("lsa", "fast-lsa", "textrank"):
+            if algorithm == "lsa" and sentences > 2000:
+                continue  # The full SVD takes minutes at this size; that's what fast-lsa is for.
+            summarize_text.SUMMARY_ALGORITHM = algorithm
+            seconds, summary = _timed(lambda: summarize_text.summarize(text), repeat)
+            results.append({"name": "summarization", "params": {"algorithm": algorithm, "sentences": sentences},
+                            "seconds": seconds, "fell_back": summary == text})
+    return results
+
+
+def scenario_chunking(sentence_counts, repeat):
+    results = []
+    for sentences in sentence_counts:
+        parts = re.split(r"(?<=\.)\s+", synthetic_text(sentences, seed=sentences))
+        for use_ssml in (False, True):
+            seconds, chunks = _timed(lambda: text_to_speech.plan_tts_chunks(parts, use_ssml=use_ssml), repeat)
+            results.append({"name": "chunking", "params": {"sentences": sentences, "ssml": use_ssml},
+                            "seconds": seconds, "requests": len(chunks)})
+    return results
+
+
+def scenario_synthesis(sentences, concurrency_levels, latency, error_rate, ratelimit_rate, repeat):
+    results = []
+    text = synthetic_text(sentences, seed=1)
+    in_flight = text_to_speech._in_flight
+    for workers in concurrency_levels:
+        client = FakeTextToSpeechClient(latency=latency, error_rate=error_rate, ratelimit_rate=ratelimit_rate)
+        output_path = os.path.join(_SCRATCH_DIR, f"synthesis_{workers}.mp3")
+        # The process-wide TTS_MAX_IN_FLIGHT cap would otherwise bound every level above it.
+        text_to_speech._in_flight = threading.BoundedSemaphore(max(1, workers))
+        try:
+            seconds, audio_path = _timed(
+                lambda: text_to_speech.convert_text_to_speech(text, max_workers=workers, client=client,
+                                                             output_path=output_path),
+                repeat,
+            )
+        finally:
+            text_to_speech._in_flight = in_flight
+        results.append({"name": "synthesis",
+                        "params": {"sentences": sentences, "workers": workers, "latency": latency,
+                                   "error_rate": error_rate, "ratelimit_rate": ratelimit_rate},
+                        "seconds": seconds, "api_calls": client.calls // repeat, "ok": bool(audio_path),
+                        "in_flight_cap": workers})
+    return results
+
+
+def scenario_concatenation(chunk_counts, repeat):
+    results = []
+    for encoding in ("MP3", "LINEAR16"):
+        chunk = fake_audio(4000, encoding)
+        for count in chunk_counts:
+            path = os.path.join(_SCRATCH_DIR, f"concat.{encoding.lower()}")
+
+            def assemble():
+                writer = text_to_speech._AudioFileWriter(path, encoding)
+                for _ in range(count):
+                    writer.append(chunk)
+                writer.commit()
+                return os.path.getsize(path)
+
+            seconds, size = _timed(assemble, repeat)
+            results.append({"name": "concatenation", "params": {"encoding": encoding, "chunks": count},
+                            "seconds": seconds, "mb_per_second": size / seconds / 1e6})
+    return results
+
+
+def scenario_upload(audio_sizes_mb, latency, ratelimit_rate, repeat):
+    results = []
+    for size_mb in audio_sizes_mb:
+        audio_path = os.path.join(_SCRATCH_DIR, f"upload_{size_mb}.mp3")
+        with open(audio_path, "wb") as f:
+            f.write(os.urandom(int(size_mb * 1024 * 1024)))
+        with FakeSlackServer(latency=latency, ratelimit_rate=ratelimit_rate) as server:
+            client = WebClient(token="xoxb-benchmark", base_url=server.base_url)
+            slack_sender.invalidate_channel_id(slack_sender.TARGET_CHANNEL_NAME)
+            seconds, ok = _timed(lambda: slack_sender.send_to_slack(audio_path, "00/2099", "benchmark", client=client),
+                                 repeat)
+            results.append({"name": "upload", "params": {"size_mb": size_mb, "latency": latency,
+                                                         "ratelimit_rate": ratelimit_rate},
+                            "seconds": seconds, "ok": ok, "api_calls": sum(server.calls.values())})
+    return results
+
+
+def _run_scenario(name, fn, *args):
+    print(f"\n=== Benchmark: {name} ===")
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f"Benchmark '{name}' failed: {e}")
+        return [{"name": name, "params": {}, "error": str(e)}]
+
+
+def _key(result):
+    return f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+
+
+def compare(current, baseline, threshold):
+    """Prints per-scenario time ratios against a baseline run; returns the number of regressions."""
+    previous = {_key(r): r for r in baseline["results"] if "seconds" in r}
+    regressions = 0
+    print(f"\n{'scenario':<90} {'base (s)':>10} {'now (s)':>10} {'ratio':>7}")
+    for result in current["results"]:
+        old = previous.get(_key(result))
+        if not old or "seconds" not in result:
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- regression"
+            regressions += 1
+        print(f"{_key(result):<90} {old['seconds']:>10.4f} {result['seconds']:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do pipeline (sem credenciais).")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Piora relativa a partir da qual um cenário é marcado como regressão.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por cenário (usa a mediana).")
+    parser.add_argument("--pages", default="1,10,50,200", help="Número de páginas dos PDFs sintéticos.")
+    parser.add_argument("--tts-latency", type=float, default=0.05, help="Latência simulada do TTS (s).")
+    parser.add_argument("--slack-latency", type=float, default=0.02, help="Latência simulada do Slack (s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de erros 5xx/UNAVAILABLE simulados.")
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0, help="Fração de respostas 429 simuladas.")
+    args = parser.parse_args()
+
+    page_counts = tuple(int(p) for p in args.pages.split(","))
+    try:
+        corpus = generate_corpus(os.path.join(_SCRATCH_DIR, "corpus"), page_counts)
+        results = []
+        results += _run_scenario("extraction", scenario_extraction, corpus, args.repeat)
+        results += _run_scenario("summarization", scenario_summarization, (200, 2000, 20000), args.repeat)
+        results += _run_scenario("chunking", scenario_chunking, (100, 5000), args.repeat)
+        results += _run_scenario("synthesis", scenario_synthesis, 150, (1, 4, 8), args.tts_latency,
+                                 args.error_rate, args.ratelimit_rate, 1)
+        results += _run_scenario("concatenation", scenario_concatenation, (10, 200), args.repeat)
+        results += _run_scenario("upload", scenario_upload, (1, 10), args.slack_latency, args.ratelimit_rate, 1)
+    finally:
+        shutil.rmtree(_SCRATCH_DIR, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{regressions} cenário(s) com regressão acima de {args.threshold:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import os
 import sys
 import re
+import json
+import argparse
 from urllib.parse import urlparse
 
 # --- FORCE UNSET REQUESTS_CA_BUNDLE HERE ---
@@ -13,10 +15,16 @@ else:
 print(f"REQUESTS_CA_BUNDLE (after deletion attempt): {os.getenv('REQUESTS_CA_BUNDLE')}")
 # ---------------------------------------------
 
-from text_to_speech import convert_text_to_speech
-from pdf_processor import extract_text_from_pdf
-from summarize_text import summarize
-from slack_sender import send_to_slack, TARGET_CHANNEL_NAME
+# Os módulos abaixo são leves: Google TTS, Slack SDK, Sumy/NLTK e PyMuPDF só são
+# importados no primeiro uso, então `--check` e erros de validação respondem rápido.
+from text_to_speech import convert_text_to_speech, KEY_FILE_PATH
+from workspace import JobWorkspace, workspace_base_dir, exit_on_sigterm
+from artifact_store import extract_text_cached, summarize_cached
+from tts_budget import apply_tts_budget
+import metrics
+from slack_sender import publish_to_slack, parse_targets, target_key, PublishResult, TARGET_CHANNEL_NAME
+from publish_ledger import claim_bulletin, record_stage, record_result, delivered_targets, record_delivery
+from nlp_setup import find_punkt_data
 
 # Template para a mensagem do Slack
 INITIAL_COMMENT_TEMPLATE = "Olá aqui é automação de OPIN e gostaria de compartilhar o resumo do Boletim Numero {bulletin_number}"
@@ -58,10 +66,33 @@ def get_bulletin_number_from_filepath(pdf_filepath):
     
     return "(não encontrado)" # Fallback se nenhum padrão for encontrado ou houver erro
 
-def main():
-    print("--- Iniciando Pipeline Open Insurance Slack Bot (Versão PDF - Arquivo Local) ---")
+def publish_audio(claim, audio_filepath, bulletin_number, targets=None, thread_ts=None):
+    """
+    Publishes the bulletin's audio (see slack_sender.publish_to_slack), skipping the
+    channels that already received it in an earlier, partly failed attempt according to
+    the publish ledger, and records each channel as soon as it is delivered.
 
-    # --- Check Slack Token --- 
+    Returns:
+        list[PublishResult]: One result per target (default parse_targets()); channels
+        delivered earlier are reported as ok with their earlier file ID.
+    """
+    targets = parse_targets() if targets is None else targets
+    delivered = delivered_targets(claim)
+    pending = [target for target in targets if target_key(target) not in delivered]
+    if len(pending) < len(targets):
+        already = ", ".join(t.channel for t in targets if t not in pending)
+        print(f"Canais que já receberam este boletim (não serão repetidos): {already}")
+    initial_comment = INITIAL_COMMENT_TEMPLATE.format(bulletin_number=bulletin_number)
+    results = publish_to_slack(audio_filepath, bulletin_number, initial_comment, targets=pending,
+                               thread_ts=thread_ts) if pending else []
+    for result in results:
+        if result.ok:
+            record_delivery(claim, target_key(result.target), result.file_id)
+    by_target = {result.target: result for result in results}
+    return [by_target.get(t) or PublishResult(t, True, None, delivered[target_key(t)], None) for t in targets]
+
+def check_slack_token():
+    """Checks that SLACK_BOT_TOKEN is set, printing setup instructions if it is not."""
     slack_token = os.environ.get("SLACK_BOT_TOKEN")
     if not slack_token:
         print("""
@@ -80,77 +111,214 @@ def main():
         * (e.g., sudo apt-get update && sudo apt-get install poppler-utils)*
         **********************************************************************
         """.format(channel=TARGET_CHANNEL_NAME))
-        sys.exit(1)
-    else:
-        print("SLACK_BOT_TOKEN encontrado. Pressupondo que poppler-utils esteja instalado. Executando...")
+        return False
+    print("SLACK_BOT_TOKEN encontrado. Pressupondo que poppler-utils esteja instalado. Executando...")
+    return True
+
+def check_config(pdf_filepath=None):
+    """
+    Validates the configuration (Slack token, Google service account key, NLTK data,
+    output directory and, if given, the PDF path) using only the filesystem and the
+    environment, without importing the heavy dependencies or calling any API.
+
+    Returns:
+        bool: True if every check passed, False otherwise.
+    """
+    problems = []
+
+    slack_token = os.environ.get("SLACK_BOT_TOKEN", "")
+    if not slack_token:
+        problems.append("SLACK_BOT_TOKEN não está definido.")
+    elif not slack_token.startswith("xoxb-"):
+        problems.append("SLACK_BOT_TOKEN não parece um Bot User OAuth Token (deve começar com xoxb-).")
+    for target in parse_targets():
+        if not target.token:
+            problems.append(f"Canal '{target.channel}' (SLACK_TARGETS) sem token de bot definido.")
 
-    # --- Step 1: Get PDF File Path Manually --- 
     try:
-        pdf_filepath_input = input("\nPor favor, cole o CAMINHO COMPLETO para o arquivo PDF do boletim baixado e pressione Enter:\n(Ex: C:\\Users\\SeuUsuario\\Downloads\\B25-021.pdf ou /home/usuario/Downloads/B25-021.pdf)\n> ").strip()
-        
-        if not pdf_filepath_input:
-            print("Erro: Nenhum caminho fornecido. Saindo.")
-            sys.exit(1)
-        pdf_filepath_input = pdf_filepath_input.strip("\"'")
-            
-        if not pdf_filepath_input.lower().endswith(".pdf"):
-            print("Erro: O caminho fornecido não termina com .pdf. Saindo.")
-            sys.exit(1)
-        if not os.path.exists(pdf_filepath_input):
-            print(f"Erro: O arquivo não foi encontrado no caminho especificado: {pdf_filepath_input}. Verifique o caminho e tente novamente. Saindo.")
-            sys.exit(1)
-            
-    except EOFError:
-        print("\nEntrada cancelada. Saindo.")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Erro ao processar o caminho do arquivo: {e}. Saindo.")
-        sys.exit(1)
+        with open(KEY_FILE_PATH, "r", encoding="utf-8") as f:
+            key = json.load(f)
+        if key.get("type") != "service_account":
+            problems.append(f"KEY_FILE_PATH ({KEY_FILE_PATH}) não é uma chave de conta de serviço.")
+    except (OSError, ValueError) as e:
+        problems.append(f"KEY_FILE_PATH ({KEY_FILE_PATH}) ilegível: {e}")
 
-    pdf_filepath = pdf_filepath_input
-    print(f"Caminho do arquivo PDF recebido e validado: {pdf_filepath}")
+    punkt_path = find_punkt_data()
+    if punkt_path:
+        print(f"Tokenizer NLTK encontrado: {punkt_path}")
+    else:
+        problems.append(f"Tokenizer NLTK 'punkt_tab' não encontrado (NLTK_DATA={os.getenv('NLTK_DATA', 'não definido')}).")
+
+    output_dir = workspace_base_dir()
+    if not os.path.isdir(output_dir) or not os.access(output_dir, os.W_OK):
+        problems.append(f"Diretório de trabalho (WORKSPACE_BASE_DIR) sem permissão de escrita ou inexistente: {output_dir}")
+
+    if pdf_filepath and not os.path.isfile(pdf_filepath):
+        problems.append(f"Arquivo PDF não encontrado: {pdf_filepath}")
+
+    for problem in problems:
+        print(f"Erro: {problem}")
+    if not problems:
+        print("Configuração OK.")
+    return not problems
+
+def process_bulletin(pdf_filepath, force=False, targets=None, thread_ts=None):
+    """
+    Runs Steps 2-6 of the pipeline (extract, summarize, TTS, Slack, cleanup) for one PDF.
+    Shared by the interactive CLI and the long-running modes (e.g. watcher.py), which
+    reuse the warm TTS/Slack clients and summarizer across calls. Each step is timed
+    as a stage of one metrics run (see metrics.py).
+
+    The bulletin is first claimed in the publish ledger (publish_ledger.py): a PDF
+    already delivered is skipped unless `force` is set, and one being processed by
+    another worker is never started twice. On-demand runs that deliver to explicit
+    `targets` (e.g. a reply in the `thread_ts` thread, see slack_service.py) bypass the
+    ledger, which only tracks publication to the configured channels.
+
+    Returns:
+        bool: True if the audio was delivered to Slack (now or in an earlier run), False otherwise,
+        or None when another worker currently holds the bulletin's claim (nothing was done).
+    """
     bulletin_number = get_bulletin_number_from_filepath(pdf_filepath)
     print(f"Número do boletim extraído (ou padrão): {bulletin_number}")
 
+    claim = claim_bulletin(pdf_filepath, bulletin_number, force=force) if targets is None else None
+    if claim is not None and not claim.acquired:
+        if claim.previous_status == "done":
+            print(f"Boletim {bulletin_number} já foi publicado a partir deste mesmo PDF. Nada a fazer (use --force para publicar novamente).")
+            return True
+        print(f"Boletim {bulletin_number} já está sendo processado por outro worker. Ignorando.")
+        return None
+
+    with metrics.run(os.path.basename(pdf_filepath)) as run:
+        try:
+            # Each job gets its own scratch directory (workspace.py), removed even on errors,
+            # so concurrent runs never overwrite or delete each other's audio.
+            with JobWorkspace(os.path.basename(pdf_filepath)) as workspace:
+                success = _run_stages(pdf_filepath, bulletin_number, claim, workspace, targets, thread_ts)
+        except BaseException as e:
+            # Also on Ctrl+C and SIGTERM (SystemExit, see workspace.exit_on_sigterm), so an
+            # interrupted run never leaves the bulletin "running" in the ledger.
+            record_result(claim, False, error=str(e) or type(e).__name__)
+            raise
+        run.counters["success"] = int(success)
+    return success
+
+def _run_stages(pdf_filepath, bulletin_number, claim, workspace, targets=None, thread_ts=None):
     # --- Step 2: Extract Text from PDF (Download step removed) --- 
     print("\nEtapa 2: Extraindo texto do PDF local...")
-    extracted_text = extract_text_from_pdf(pdf_filepath)
+    record_stage(claim, "extract")
+    with metrics.stage("extract", bytes_in=os.path.getsize(pdf_filepath)) as stage:
+        # Extracted text and summaries are cached by PDF hash (artifact_store.py), so
+        # re-processing a bulletin only pays for the stages whose parameters changed.
+        pdf_sha256, extracted_text = extract_text_cached(pdf_filepath)
+        stage["bytes_out"] = len(extracted_text.encode("utf-8")) if extracted_text else 0
     if not extracted_text:
         print("Pipeline finalizada: Falha ao extrair texto do PDF.")
-        sys.exit(1)
+        record_result(claim, False, "extract", "No text could be extracted from the PDF.")
+        return False
     print(f"Texto extraído com sucesso (comprimento: {len(extracted_text)} caracteres).")
 
     # --- Step 3: Summarize Text --- 
     print("\nEtapa 3: Gerando resumo do texto...")
-    summary_text = summarize(extracted_text)
-    print(f"Resumo gerado (ou texto original retornado).")
+    record_stage(claim, "summarize")
+    with metrics.stage("summarize", bytes_in=stage["bytes_out"]) as stage:
+        summary_text = summarize_cached(pdf_sha256, extracted_text)
+        # Guardrail: never send the full bulletin (or an oversized summary) to TTS.
+        budget = apply_tts_budget(summary_text, extracted_text)
+        summary_text = budget.text
+        stage["bytes_out"] = len(summary_text.encode("utf-8"))
+        stage["path"] = budget.path
+    print(f"Resumo gerado (caminho: {budget.path} - {budget.reason}; {len(summary_text)} caracteres).")
 
     # --- Step 4: Convert Summary to Speech --- 
     print("\nEtapa 4: Convertendo resumo para áudio...")
-    audio_filepath = convert_text_to_speech(summary_text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E')
+    audio_filename = os.path.splitext(os.path.basename(pdf_filepath))[0] + ".mp3"  # Also the file name shown in Slack.
+    record_stage(claim, "tts")
+    with metrics.stage("tts", bytes_in=stage["bytes_out"]) as stage:
+        audio_filepath = convert_text_to_speech(summary_text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E',
+                                                output_path=workspace.file(audio_filename))
+        stage["bytes_out"] = os.path.getsize(audio_filepath) if audio_filepath else 0
     if not audio_filepath:
         print("Pipeline finalizada: Falha ao gerar arquivo de áudio.")
-        sys.exit(1)
+        record_result(claim, False, "tts", "Failed to generate the audio file.")
+        return False
     print(f"Áudio gerado com sucesso: {audio_filepath}")
 
     # --- Step 5: Send to Slack --- 
     print("\nEtapa 5: Enviando para o Slack...")
-    initial_comment = INITIAL_COMMENT_TEMPLATE.format(bulletin_number=bulletin_number)
-    success = send_to_slack(audio_filepath, bulletin_number, initial_comment)
+    record_stage(claim, "slack")
+    with metrics.stage("slack", bytes_in=stage["bytes_out"]):
+        results = publish_audio(claim, audio_filepath, bulletin_number, targets=targets, thread_ts=thread_ts)
+    success = bool(results) and all(result.ok for result in results)
+    slack_file_ids = sorted({result.file_id for result in results if result.file_id})
 
     if success:
         print("Envio para o Slack realizado com sucesso!")
+        record_result(claim, True, "slack", slack_file_ids=slack_file_ids)
     else:
         print("Falha ao enviar para o Slack. Verifique os logs e a configuração do token/permissões.")
+        errors = "; ".join(f"{r.target.channel}: {r.error}" for r in results if not r.ok)
+        record_result(claim, False, "slack", errors or "Failed to send to Slack.", slack_file_ids)
 
     # --- Step 6: Cleanup --- 
     print("\nEtapa 6: Limpeza...")
+    with metrics.stage("cleanup"):
+        workspace.cleanup()
+        print(f"Diretório de trabalho temporário removido: {workspace.path}")
+
+    return success
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume um boletim do Open Insurance em áudio e envia para o Slack.")
+    parser.add_argument("pdf_path", nargs="?", help="Caminho do PDF do boletim (se omitido, é solicitado interativamente).")
+    parser.add_argument("--check", action="store_true",
+                        help="Apenas valida a configuração, sem carregar as dependências pesadas nem processar nada.")
+    parser.add_argument("--force", action="store_true",
+                        help="Publica novamente mesmo que o registro de publicações indique que o boletim já foi enviado.")
+    args = parser.parse_args()
+    exit_on_sigterm()
+
+    if args.check:
+        sys.exit(0 if check_config(args.pdf_path) else 1)
+
+    print("--- Iniciando Pipeline Open Insurance Slack Bot (Versão PDF - Arquivo Local) ---")
+
+    # --- Check Slack Token --- 
+    if not check_slack_token():
+        sys.exit(1)
+
+    # --- Step 1: Get PDF File Path (argument or manual input) --- 
     try:
-        if audio_filepath and os.path.exists(audio_filepath):
-            os.remove(audio_filepath)
-            print(f"Arquivo de áudio temporário removido: {audio_filepath}")
+        if args.pdf_path:
+            pdf_filepath_input = args.pdf_path.strip()
+        else:
+            pdf_filepath_input = input("\nPor favor, cole o CAMINHO COMPLETO para o arquivo PDF do boletim baixado e pressione Enter:\n(Ex: C:\\Users\\SeuUsuario\\Downloads\\B25-021.pdf ou /home/usuario/Downloads/B25-021.pdf)\n> ").strip()
+        
+        if not pdf_filepath_input:
+            print("Erro: Nenhum caminho fornecido. Saindo.")
+            sys.exit(1)
+        pdf_filepath_input = pdf_filepath_input.strip("\"'")
+            
+        if not pdf_filepath_input.lower().endswith(".pdf"):
+            print("Erro: O caminho fornecido não termina com .pdf. Saindo.")
+            sys.exit(1)
+        if not os.path.exists(pdf_filepath_input):
+            print(f"Erro: O arquivo não foi encontrado no caminho especificado: {pdf_filepath_input}. Verifique o caminho e tente novamente. Saindo.")
+            sys.exit(1)
+            
+    except EOFError:
+        print("\nEntrada cancelada. Saindo.")
+        sys.exit(1)
     except Exception as e:
-        print(f"Erro durante a limpeza do arquivo de áudio temporário: {e}")
+        print(f"Erro ao processar o caminho do arquivo: {e}. Saindo.")
+        sys.exit(1)
+
+    pdf_filepath = pdf_filepath_input
+    print(f"Caminho do arquivo PDF recebido e validado: {pdf_filepath}")
+
+    if not process_bulletin(pdf_filepath, force=args.force):
+        sys.exit(1)
 
     print("\n--- Pipeline Concluído --- ")
 
@@ -0,0 +1,280 @@
+import os
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; child-process CPU is then not counted.
+    resource = None
+
+# Optional outputs (disabled when empty):
+# - METRICS_RUNS_PATH: JSON-lines file with one record per processed bulletin
+# - METRICS_PROM_PATH: Prometheus text-format file, rewritten after every run
+#   (suitable for node_exporter's textfile collector)
+METRICS_RUNS_PATH = os.getenv("METRICS_RUNS_PATH", "")
+METRICS_PROM_PATH = os.getenv("METRICS_PROM_PATH", "")
+
+# PIPELINE_PROFILE=cprofile writes a .prof file per run; =tracemalloc prints the top allocations.
+PIPELINE_PROFILE = os.getenv("PIPELINE_PROFILE", "").lower()
+PIPELINE_PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+
+# Latency buckets (seconds) shared by the external-call histograms.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative latency histogram with Prometheus-style buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Run:
+    """Everything measured while processing one bulletin; serialized as a JSON-lines record."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.stages = []
+        self.counters = {}
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "run": self.name,
+                "started_at": self.started_at,
+                "stages": list(self.stages),
+                "counters": dict(self.counters),
+                "latencies": {
+                    name: {"count": len(values), "sum": sum(values), "max": max(values)}
+                    for name, values in self.latencies.items()
+                },
+            }
+
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_stage_totals = {}  # stage -> [count, wall_seconds, cpu_seconds]
+_current_run = contextvars.ContextVar("current_run", default=None)
+_stage_worker_cpu = contextvars.ContextVar("stage_worker_cpu", default=None)  # [seconds] of the active stage
+
+
+def inc(name, amount=1):
+    """Increments a process-wide counter (and the current run's copy)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+    current = _current_run.get()
+    if current is not None:
+        with current._lock:
+            current.counters[name] = current.counters.get(name, 0) + amount
+
+
+def observe(name, seconds):
+    """Records one latency sample in histogram `name`."""
+    with _lock:
+        _histograms.setdefault(name, Histogram()).observe(seconds)
+    current = _current_run.get()
+    if current is not None:
+        with current._lock:
+            current.latencies.setdefault(name, []).append(seconds)
+
+
+def timed_call(name, fn, *args, **kwargs):
+    """Calls `fn`, recording its latency in histogram `name` (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+@contextmanager
+def stage(name, bytes_in=None):
+    """
+    Times one pipeline stage (wall-clock and CPU time). The yielded dict can be updated
+    with `bytes_out` or any other detail to store in the run record.
+
+    CPU time adds up the calling thread, the pool threads running tasks started with
+    submit_in_context (e.g. the TTS requests) and the child processes that finished during
+    the stage (e.g. the extraction and summarization process pools). Other threads' work
+    is not counted, so concurrent jobs are not charged each other's CPU, except for child
+    processes of another job that happen to end during the stage.
+    """
+    record = {"stage": name, "bytes_in": bytes_in, "bytes_out": None}
+    worker_cpu = [0.0]
+    token = _stage_worker_cpu.set(worker_cpu)
+    wall_start, cpu_start, children_start = time.perf_counter(), time.thread_time(), _children_cpu()
+    try:
+        yield record
+    finally:
+        _stage_worker_cpu.reset(token)
+        cpu_seconds = time.thread_time() - cpu_start + worker_cpu[0] + _children_cpu() - children_start
+        record["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+        record["cpu_seconds"] = round(cpu_seconds, 6)
+        with _lock:
+            totals = _stage_totals.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += record["wall_seconds"]
+            totals[2] += record["cpu_seconds"]
+        current = _current_run.get()
+        if current is not None:
+            with current._lock:
+                current.stages.append(record)
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _run_counting_cpu(fn, *args, **kwargs):
+    cpu_start = time.thread_time()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        worker_cpu = _stage_worker_cpu.get()
+        if worker_cpu is not None:
+            with _lock:
+                worker_cpu[0] += time.thread_time() - cpu_start
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """
+    executor.submit() that runs `fn` in a copy of the caller's context, so it reports to
+    the caller's run and its CPU time counts for the caller's stage.
+    """
+    return executor.submit(contextvars.copy_context().run, _run_counting_cpu, fn, *args, **kwargs)
+
+
+@contextmanager
+def run(name):
+    """
+    Scope for one bulletin: stages, counters and latencies recorded inside it (also from
+    tasks started with submit_in_context) go to its run record, which is
+    appended to METRICS_RUNS_PATH when the scope ends.
+    """
+    current = Run(name)
+    token = _current_run.set(current)
+    try:
+        with _profiling(name):
+            yield current
+    finally:
+        _current_run.reset(token)
+        finish_run(current)
+
+
+@contextmanager
+def use_run(current):
+    """
+    Makes `current` the active run inside the scope without finishing it, for runs whose
+    stages execute on different threads (see pipeline_stream.py). Call finish_run() at the end.
+    """
+    token = _current_run.set(current)
+    try:
+        yield current
+    finally:
+        _current_run.reset(token)
+
+
+def finish_run(current):
+    """Writes the run record of `current` and refreshes the Prometheus file."""
+    record = current.as_dict()
+    record["wall_seconds"] = round(time.time() - current.started_at, 6)
+    _write_run_record(record)
+    _write_prometheus()
+
+
+def _write_run_record(record):
+    if not METRICS_RUNS_PATH:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(METRICS_RUNS_PATH)), exist_ok=True)
+        with _lock, open(METRICS_RUNS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Warning: could not write metrics run record to {METRICS_RUNS_PATH}: {e}")
+
+
+def prometheus_text():
+    """Renders all process-wide metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for family, column in (("runs_total", 0), ("wall_seconds_total", 1), ("cpu_seconds_total", 2)):
+            lines.append(f"# TYPE opin_stage_{family} counter")
+            for name, totals in sorted(_stage_totals.items()):
+                lines.append(f'opin_stage_{family}{{stage="{name}"}} {totals[column]:g}')
+        for name, value in sorted(_counters.items()):
+            lines.append(f"# TYPE opin_{name}_total counter")
+            lines.append(f"opin_{name}_total {value}")
+        for name, histogram in sorted(_histograms.items()):
+            lines.append(f"# TYPE opin_{name} histogram")
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'opin_{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'opin_{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"opin_{name}_sum {histogram.sum:.6f}")
+            lines.append(f"opin_{name}_count {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_prometheus():
+    if not METRICS_PROM_PATH:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(METRICS_PROM_PATH)), exist_ok=True)
+        tmp_path = f"{METRICS_PROM_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, METRICS_PROM_PATH)
+    except OSError as e:
+        print(f"Warning: could not write Prometheus metrics to {METRICS_PROM_PATH}: {e}")
+
+
+@contextmanager
+def _profiling(name):
+    if PIPELINE_PROFILE == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(PIPELINE_PROFILE_DIR, exist_ok=True)
+            safe_name = "".join(c if c.isalnum() else "_" for c in name)
+            path = os.path.join(PIPELINE_PROFILE_DIR, f"{safe_name}_{int(time.time())}.prof")
+            profiler.dump_stats(path)
+            print(f"cProfile stats written to {path}")
+    elif PIPELINE_PROFILE == "tracemalloc":
+        import tracemalloc
+
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"--- tracemalloc: peak {peak / 1024 / 1024:.1f} MiB; top allocations ---")
+            for stat in snapshot.statistics("lineno")[:10]:
+                print(f"  {stat}")
+    else:
+        yield
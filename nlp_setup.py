@@ -0,0 +1,72 @@
+import os
+import re
+import sys
+from functools import lru_cache
+
+# NLTK data is resolved from NLTK_DATA (the Docker image bakes 'punkt_tab' into
+# /usr/local/nltk_data) plus the legacy development folder below. Nothing is ever
+# downloaded at runtime: a missing tokenizer is reported once and a simple
+# regex sentence splitter is used instead.
+LEGACY_NLTK_DATA_DIR = "/home/ubuntu/nltk_data"
+
+_PUNKT_RESOURCES = (
+    os.path.join("tokenizers", "punkt_tab", "portuguese"),
+    os.path.join("tokenizers", "punkt", "portuguese.pickle"),
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def find_punkt_data():
+    """
+    Looks for the Portuguese Punkt tokenizer on disk without importing NLTK (used by `main.py --check`).
+
+    Returns:
+        str: The path of the tokenizer data found, or None.
+    """
+    search_dirs = [d for d in os.getenv("NLTK_DATA", "").split(os.pathsep) if d]
+    search_dirs += [os.path.expanduser("~/nltk_data"), os.path.join(sys.prefix, "nltk_data"),
+                    "/usr/share/nltk_data", "/usr/local/share/nltk_data", LEGACY_NLTK_DATA_DIR]
+    for directory in search_dirs:
+        for resource in _PUNKT_RESOURCES:
+            path = os.path.join(directory, resource)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+@lru_cache(maxsize=1)
+def ensure_nltk_data():
+    """
+    Imports NLTK and checks (once per process) that the Punkt sentence tokenizer is available.
+
+    Returns:
+        bool: True if NLTK's tokenizer can be used, False otherwise.
+    """
+    import nltk
+
+    if os.path.isdir(LEGACY_NLTK_DATA_DIR) and LEGACY_NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.append(LEGACY_NLTK_DATA_DIR)
+    for resource in ("tokenizers/punkt_tab/portuguese/", "tokenizers/punkt/portuguese.pickle"):
+        try:
+            nltk.data.find(resource)
+            return True
+        except LookupError:
+            continue
+    print("Warning: NLTK 'punkt_tab' tokenizer not found in NLTK_DATA "
+          f"({os.getenv('NLTK_DATA', 'not set')}); falling back to a simple sentence splitter.")
+    return False
+
+
+def split_sentences(text, language="portuguese"):
+    """Splits `text` into sentences with NLTK's Punkt when available, otherwise on sentence-ending punctuation."""
+    if ensure_nltk_data():
+        from nltk.tokenize import sent_tokenize
+
+        return sent_tokenize(text, language=language)
+    return split_sentences_simple(text)
+
+
+def split_sentences_simple(text):
+    """Splits `text` on sentence-ending punctuation (whitespace collapsed), without NLTK."""
+    return [s for s in _SENTENCE_END.split(" ".join(text.split())) if s]
@@ -1,16 +1,382 @@
 import os
+import math
+import re
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import fitz # PyMuPDF
 
 PDF_DOWNLOAD_PATH = ""
 EXTRACTED_TEXT_PATH = ""
 
+# Worker processes used to extract large PDFs (1 = always extract in-process).
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Documents with fewer pages than this are extracted in-process; the pool startup isn't worth it.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+# Pages handed to a worker at a time.
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
 
-def extract_text_from_pdf(pdf_filepath):
+# Extraction mode:
+# - "plain" (default): page.get_text() of every page, as is
+# - "structured": text blocks with font information; headers/footers/page numbers repeated
+#   across pages are dropped and headings are detected by font size, giving a section tree
+PDF_EXTRACT_MODE = os.getenv("PDF_EXTRACT_MODE", "plain").lower()
+# Structured mode: fraction of the page height at the top and bottom treated as header/footer area.
+PDF_MARGIN_BAND = float(os.getenv("PDF_MARGIN_BAND", "0.1"))
+# Structured mode: a block repeated (digits ignored) on at least this fraction of the pages is dropped
+# when it sits in the header/footer area or is short (running titles, repeated table headers).
+PDF_REPEAT_MIN_FRACTION = float(os.getenv("PDF_REPEAT_MIN_FRACTION", "0.5"))
+# Structured mode: a block whose font is at least this much larger than the body text is a heading.
+PDF_HEADING_SIZE_RATIO = float(os.getenv("PDF_HEADING_SIZE_RATIO", "1.15"))
+
+# Memory bounds (0 = no limit): text kept per page, and total text after which the remaining
+# pages are not read at all. The total defaults to SUMMARY_MAX_INPUT_CHARS, since the summarizer
+# ignores anything beyond it (read from the environment: summarize_text is too heavy to import here).
+PDF_PAGE_MAX_CHARS = int(os.getenv("PDF_PAGE_MAX_CHARS", "0"))
+PDF_TEXT_MAX_CHARS = int(os.getenv("PDF_TEXT_MAX_CHARS", os.getenv("SUMMARY_MAX_INPUT_CHARS", "400000")))
+
+# OCR fallback for pages without a text layer (scanned bulletins), through PyMuPDF's
+# Tesseract integration; needs the tesseract-ocr package and its language data (TESSDATA_PREFIX).
+PDF_OCR_ENABLED = os.getenv("PDF_OCR_ENABLED", "false").lower() in ("1", "true", "yes")
+PDF_OCR_LANGUAGE = os.getenv("PDF_OCR_LANGUAGE", "por")
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "300"))
+# Pages with fewer characters than this in their text layer are OCR'd (if they contain images).
+PDF_OCR_MIN_CHARS = int(os.getenv("PDF_OCR_MIN_CHARS", "20"))
+# Worker processes for OCR, one page per task.
+PDF_OCR_WORKERS = int(os.getenv("PDF_OCR_WORKERS", str(os.cpu_count() or 1)))
+
+_SHORT_BLOCK_CHARS = 80
+_MAX_HEADING_CHARS = 200
+_PAGE_NUMBER = re.compile(r"^(p[aá]g(ina)?\.?\s*)?\d+(\s*(de|of|/)\s*\d+)?$", re.IGNORECASE)
+
+# One text block of a page (structured mode): its text on a single line, the dominant
+# font size, whether it is entirely bold, and its vertical position relative to the page height.
+PageBlock = namedtuple("PageBlock", ["text", "size", "bold", "top", "bottom"])
+
+
+class Section:
+    """A node of the section tree built by structured extraction."""
+
+    def __init__(self, title="", level=0):
+        self.title = title
+        self.level = level
+        self.paragraphs = []
+        self.children = []
+
+    def walk(self):
+        """Yields this section and all its descendants, in document order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def extraction_params():
+    """Identifies the extractor configuration, for caching extracted text (see artifact_store.py)."""
+    if PDF_EXTRACT_MODE == "structured":
+        params = f"pymupdf:structured:{PDF_MARGIN_BAND}:{PDF_REPEAT_MIN_FRACTION}:{PDF_HEADING_SIZE_RATIO}"
+    else:
+        params = "pymupdf:plain"
+    if PDF_PAGE_MAX_CHARS or PDF_TEXT_MAX_CHARS:
+        params += f":max:{PDF_PAGE_MAX_CHARS}:{PDF_TEXT_MAX_CHARS}"
+    if PDF_OCR_ENABLED:
+        params += f":ocr:{PDF_OCR_LANGUAGE}:{PDF_OCR_DPI}:{PDF_OCR_MIN_CHARS}"
+    return params
+
+
+def _page_blocks(page, textpage=None):
+    """Reads the text blocks of one page with their dominant font size (structured mode)."""
+    height = page.rect.height or 1
+    blocks = []
+    for block in page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE, textpage=textpage)["blocks"]:
+        if block.get("type") != 0:  # Images
+            continue
+        sizes = Counter()
+        bold_chars = chars = 0
+        parts = []
+        for line in block["lines"]:
+            for span in line["spans"]:
+                text = span["text"]
+                n = len(text.strip())
+                if not n:
+                    continue
+                parts.append(text)
+                sizes[round(span["size"] * 2) / 2] += n
+                chars += n
+                if span["flags"] & 16:  # Bold
+                    bold_chars += n
+        text = " ".join(" ".join(parts).split())
+        if text:
+            y0, y1 = block["bbox"][1], block["bbox"][3]
+            blocks.append(PageBlock(text, sizes.most_common(1)[0][0], bold_chars == chars, y0 / height, y1 / height))
+    return blocks
+
+
+def _page_chars(page):
+    """Characters of a page as returned by _read_page (its text, or its list of PageBlock)."""
+    return len(page) if isinstance(page, str) else sum(len(block.text) for block in page)
+
+
+def _read_page(page, structured, textpage=None):
+    """Returns the text (or blocks) of one page, cut to PDF_PAGE_MAX_CHARS."""
+    if structured:
+        blocks = _page_blocks(page, textpage)
+        if not PDF_PAGE_MAX_CHARS:
+            return blocks
+        kept, chars = [], 0
+        for block in blocks:
+            chars += len(block.text)
+            if chars > PDF_PAGE_MAX_CHARS:
+                break
+            kept.append(block)
+        return kept
+    text = page.get_text(textpage=textpage)
+    if PDF_PAGE_MAX_CHARS and len(text) > PDF_PAGE_MAX_CHARS:
+        cut = text.rfind(" ", 0, PDF_PAGE_MAX_CHARS)
+        text = text[:cut if cut > 0 else PDF_PAGE_MAX_CHARS] + "\n"
+    return text
+
+
+def _extract_page_range(pdf_filepath, start, stop, structured=False):
+    """Worker task: opens its own document handle and returns the text (or blocks) of pages [start, stop)."""
+    with fitz.open(pdf_filepath) as doc:
+        return [_read_page(doc.load_page(page_num), structured) for page_num in range(start, stop)]
+
+
+def _ocr_page(pdf_filepath, page_num, structured=False):
+    """
+    Worker task: OCRs one page and returns its text (or blocks), or None when the page
+    has no images to read (blank pages are not worth a Tesseract run).
+    """
+    with fitz.open(pdf_filepath) as doc:
+        page = doc.load_page(page_num)
+        if not page.get_images(full=False):
+            return None
+        textpage = page.get_textpage_ocr(language=PDF_OCR_LANGUAGE, dpi=PDF_OCR_DPI, full=True)
+        return _read_page(page, structured, textpage)
+
+
+def iter_page_texts(pdf_filepath, workers=None):
+    """
+    Yields the text of each page of a PDF, in page order, as soon as it is available.
+
+    Small documents are read sequentially. Documents with at least PDF_PARALLEL_MIN_PAGES
+    pages are split into page ranges extracted by `workers` processes (default
+    PDF_EXTRACT_WORKERS), each with its own fitz handle. Only a small window of ranges
+    is in flight at once, so memory stays bounded regardless of page count, and closing
+    the iterator early cancels the ranges not started yet. Pages are cut to PDF_PAGE_MAX_CHARS.
+
+    Args:
+        pdf_filepath (str): The path to the local PDF file.
+        workers (int, optional): Number of worker processes.
+
+    Yields:
+        str: The text of one page.
+    """
+    return _iter_pages(pdf_filepath, workers, structured=False)
+
+
+def iter_page_blocks(pdf_filepath, workers=None):
+    """Like iter_page_texts, but yields each page's list of PageBlock (structured mode)."""
+    return _iter_pages(pdf_filepath, workers, structured=True)
+
+
+def _iter_pages(pdf_filepath, workers, structured):
+    if workers is None:
+        workers = PDF_EXTRACT_WORKERS
+
+    with fitz.open(pdf_filepath) as doc:
+        page_count = len(doc)
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            for page_num in range(page_count):
+                yield _read_page(doc.load_page(page_num), structured)
+            return
+
+    ranges = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        in_flight = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, stop = ranges.popleft()
+                in_flight.append(executor.submit(_extract_page_range, pdf_filepath, start, stop, structured))
+            for page in in_flight.popleft().result():
+                yield page
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _ocr_pages(pdf_filepath, page_nums, structured, workers):
+    """Yields (page_num, text or blocks or None) for `page_nums`, in order, OCR'd by up to `workers` processes."""
+    if workers <= 1 or len(page_nums) == 1:
+        for page_num in page_nums:
+            yield page_num, _ocr_page(pdf_filepath, page_num, structured)
+        return
+    pending = deque(page_nums)
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(page_nums)))
+    try:
+        in_flight = deque()
+        while pending or in_flight:
+            while pending and len(in_flight) < workers * 2:
+                page_num = pending.popleft()
+                in_flight.append((page_num, executor.submit(_ocr_page, pdf_filepath, page_num, structured)))
+            page_num, future = in_flight.popleft()
+            yield page_num, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _collect_pages(pdf_filepath, workers, structured):
+    """
+    Reads the pages of a PDF (text or blocks) up to PDF_TEXT_MAX_CHARS, then, with
+    PDF_OCR_ENABLED, OCRs the pages read so far that have no usable text layer.
+    """
+    pages, total = [], 0
+    page_iter = _iter_pages(pdf_filepath, workers, structured)
+    try:
+        for page in page_iter:
+            pages.append(page)
+            total += _page_chars(page)
+            if PDF_TEXT_MAX_CHARS and total >= PDF_TEXT_MAX_CHARS:
+                print(f"Stopping extraction after {len(pages)} pages: {total} chars reached (PDF_TEXT_MAX_CHARS).")
+                break
+    finally:
+        page_iter.close()  # Cancels the page ranges not started yet.
+
+    missing = [i for i, page in enumerate(pages) if _page_chars(page) < PDF_OCR_MIN_CHARS]
+    if not PDF_OCR_ENABLED or not missing:
+        return pages
+    print(f"Running OCR on {len(missing)} page(s) without a text layer ({PDF_OCR_LANGUAGE}, {PDF_OCR_DPI} dpi)...")
+    ocr_pages = _ocr_pages(pdf_filepath, missing, structured, PDF_OCR_WORKERS)
+    try:
+        for page_num, page in ocr_pages:
+            if page is None:
+                continue
+            total += _page_chars(page) - _page_chars(pages[page_num])
+            pages[page_num] = page
+            if PDF_TEXT_MAX_CHARS and total >= PDF_TEXT_MAX_CHARS:
+                print(f"Stopping OCR after page {page_num + 1}: {total} chars reached (PDF_TEXT_MAX_CHARS).")
+                return pages[:page_num + 1]
+    except RuntimeError as e:  # Tesseract or its language data is missing
+        print(f"Warning: OCR unavailable, continuing with the text layer only: {e}")
+    finally:
+        ocr_pages.close()
+    return pages
+
+
+def _repeat_key(text):
+    return " ".join(re.sub(r"\d+", "#", text.lower()).split())
+
+
+def _drop_page_furniture(pages):
+    """Removes headers, footers, page numbers and short blocks repeated across pages."""
+    in_margin = lambda b: b.bottom <= PDF_MARGIN_BAND or b.top >= 1 - PDF_MARGIN_BAND
+    repeated = set()
+    if len(pages) >= 2:
+        page_counts = Counter(key for blocks in pages for key in {_repeat_key(b.text) for b in blocks})
+        threshold = max(2, math.ceil(PDF_REPEAT_MIN_FRACTION * len(pages)))
+        repeated = {key for key, count in page_counts.items() if count >= threshold}
+    kept = []
+    for blocks in pages:
+        for block in blocks:
+            if in_margin(block) and _PAGE_NUMBER.match(block.text):
+                continue
+            if _repeat_key(block.text) in repeated and (in_margin(block) or len(block.text) <= _SHORT_BLOCK_CHARS):
+                continue
+            kept.append(block)
+    return kept
+
+
+def build_section_tree(pages):
+    """
+    Builds the section tree from the PageBlock lists of all pages: page furniture is
+    dropped, the body font size is the most common one (by characters), and blocks set
+    noticeably larger than it (or short, fully bold lines) become headings, with one
+    level per distinct heading size.
+
+    Returns:
+        Section: The root section (untitled; holds any text before the first heading).
+    """
+    blocks = _drop_page_furniture(pages)
+    root = Section()
+    if not blocks:
+        return root
+    sizes = Counter()
+    for block in blocks:
+        sizes[block.size] += len(block.text)
+    body_size = sizes.most_common(1)[0][0]
+
+    def heading_size(block):
+        if len(block.text) > _MAX_HEADING_CHARS or block.text.endswith((".", ":", ";", ",")):
+            return None
+        if block.size >= body_size * PDF_HEADING_SIZE_RATIO:
+            return block.size
+        if block.bold and len(block.text) <= _SHORT_BLOCK_CHARS:
+            return body_size  # Bold run-in headings at body size get the lowest level.
+        return None
+
+    levels = {size: i + 1 for i, size in enumerate(sorted({heading_size(b) for b in blocks} - {None}, reverse=True))}
+    stack = [root]
+    for block in blocks:
+        size = heading_size(block)
+        if size is None:
+            stack[-1].paragraphs.append(block.text)
+            continue
+        section = Section(block.text, levels[size])
+        while stack[-1].level >= section.level:
+            stack.pop()
+        stack[-1].children.append(section)
+        stack.append(section)
+    return root
+
+
+def render_sections(root):
+    """
+    Serializes a section tree as compact text: each section is its title on one line
+    followed by one line per paragraph, and sections are separated by a blank line
+    (the untitled root renders with an empty title line). parse_sections() reverses it.
+    """
+    parts = []
+    for section in root.walk():
+        if section.title or section.paragraphs:
+            parts.append("\n".join([section.title] + section.paragraphs))
+    return "\n\n".join(parts)
+
+
+def parse_sections(text):
+    """
+    Splits text produced by render_sections() into (title, body) pairs, in document order.
+
+    Returns:
+        list[tuple]: (title, body) for every section; the title is "" for the leading untitled text.
+    """
+    sections = []
+    for part in text.split("\n\n"):
+        title, _, body = part.partition("\n")
+        if title or body:
+            sections.append((title, body))
+    return sections
+
+
+def extract_sections(pdf_filepath, workers=None):
+    """
+    Structured extraction: returns the section tree of a PDF (see build_section_tree).
+
+    Args:
+        pdf_filepath (str): The path to the local PDF file.
+        workers (int, optional): Worker processes for large PDFs (see iter_page_texts).
+    """
+    return build_section_tree(_collect_pages(pdf_filepath, workers, structured=True))
+
+
+def extract_text_from_pdf(pdf_filepath, workers=None):
     """
     Extracts text content from a local PDF file using PyMuPDF (fitz).
 
     Args:
         pdf_filepath (str): The absolute path to the local PDF file.
+        workers (int, optional): Worker processes for large PDFs (see iter_page_texts).
 
     Returns:
         str: The extracted text content, or None if an error occurs.
@@ -21,16 +387,17 @@ def extract_text_from_pdf(pdf_filepath):
             print(f"Error: PDF file not found at {pdf_filepath}")
             return None
 
-        doc = fitz.open(pdf_filepath)
-        full_text = ""
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            full_text += page.get_text()
-        
-        doc.close()
-        
-        if not full_text:
-            print("Warning: No text could be extracted from the PDF (might be image-based or empty).")
+        if PDF_EXTRACT_MODE == "structured":
+            root = extract_sections(pdf_filepath, workers)
+            full_text = render_sections(root)
+            print(f"Structured extraction: {sum(1 for s in root.walk() if s.title)} sections found.")
+        else:
+            # Join once at the end instead of growing a string page by page.
+            full_text = "".join(_collect_pages(pdf_filepath, workers, structured=False))
+
+        if not full_text.strip():
+            hint = "" if PDF_OCR_ENABLED else " Set PDF_OCR_ENABLED=true to OCR scanned PDFs."
+            print(f"Warning: No text could be extracted from the PDF (might be image-based or empty).{hint}")
             # Return empty string instead of None if extraction worked but found no text
             return "" 
             
@@ -0,0 +1,235 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+from main import get_bulletin_number_from_filepath, check_slack_token, publish_audio
+from artifact_store import extract_text_cached, summarize_cached
+from tts_budget import apply_tts_budget
+from text_to_speech import convert_text_to_speech
+from publish_ledger import claim_bulletin, record_stage, record_result
+from batch import collect_pdf_files
+from workspace import JobWorkspace, exit_on_sigterm
+import metrics
+
+# Bulletins waiting between two stages; a full queue blocks the stage before it,
+# so a slow stage throttles the whole pipeline instead of piling up work in memory.
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "2"))
+
+# Bulletins handled concurrently by the network-bound stages.
+STREAM_TTS_WORKERS = int(os.getenv("STREAM_TTS_WORKERS", "1"))
+STREAM_UPLOAD_WORKERS = int(os.getenv("STREAM_UPLOAD_WORKERS", "1"))
+
+_STOP = object()
+
+
+class Job:
+    """One bulletin moving through the pipeline, with the results of each stage so far."""
+
+    def __init__(self, pdf_filepath):
+        self.pdf_filepath = pdf_filepath
+        self.bulletin_number = get_bulletin_number_from_filepath(pdf_filepath)
+        self.run = metrics.Run(os.path.basename(pdf_filepath))
+        self.pdf_sha256 = None
+        self.text = None
+        self.summary = None
+        self.workspace = None  # Private scratch directory, created by the TTS stage (see workspace.py).
+        self.audio_path = None
+        self.slack_file_ids = []
+        self.claim = None
+        self.skipped = None  # Publish ledger status ("done"/"running") when the bulletin was not claimed.
+        self.failed_stage = None
+        self.error = None
+
+    @property
+    def failed(self):
+        return self.failed_stage is not None
+
+
+def extract_stage(job):
+    with metrics.stage("extract", bytes_in=os.path.getsize(job.pdf_filepath)) as stage:
+        job.pdf_sha256, job.text = extract_text_cached(job.pdf_filepath)
+        stage["bytes_out"] = len(job.text.encode("utf-8")) if job.text else 0
+    if not job.text:
+        raise RuntimeError("No text could be extracted from the PDF.")
+
+
+def summarize_stage(job):
+    with metrics.stage("summarize", bytes_in=len(job.text.encode("utf-8"))) as stage:
+        budget = apply_tts_budget(summarize_cached(job.pdf_sha256, job.text), job.text)
+        job.summary = budget.text
+        job.text = None  # Not needed downstream; don't keep whole bulletins queued in memory.
+        stage["bytes_out"] = len(job.summary.encode("utf-8"))
+        stage["path"] = budget.path
+
+
+def tts_stage(job):
+    base_name = os.path.splitext(os.path.basename(job.pdf_filepath))[0]
+    job.workspace = JobWorkspace(base_name)
+    with metrics.stage("tts", bytes_in=len(job.summary.encode("utf-8"))) as stage:
+        job.audio_path = convert_text_to_speech(
+            job.summary, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E', output_path=job.workspace.file(f"{base_name}.mp3")
+        )
+        stage["bytes_out"] = os.path.getsize(job.audio_path) if job.audio_path else 0
+    if not job.audio_path:
+        raise RuntimeError("Failed to generate the audio file.")
+
+
+def upload_stage(job):
+    try:
+        with metrics.stage("slack", bytes_in=os.path.getsize(job.audio_path)):
+            results = publish_audio(job.claim, job.audio_path, job.bulletin_number)
+        job.slack_file_ids = sorted({result.file_id for result in results if result.file_id})
+        errors = "; ".join(f"{r.target.channel}: {r.error}" for r in results if not r.ok)
+        if not results or errors:
+            raise RuntimeError(errors or "Failed to send to Slack.")
+    finally:
+        with metrics.stage("cleanup"):
+            job.workspace.cleanup()
+
+
+# (name, function, number of threads); each stage runs in its own threads and hands
+# bulletins to the next one through a bounded queue.
+STAGES = (
+    ("extract", extract_stage, 1),
+    ("summarize", summarize_stage, 1),
+    ("tts", tts_stage, max(1, STREAM_TTS_WORKERS)),
+    ("slack", upload_stage, max(1, STREAM_UPLOAD_WORKERS)),
+)
+
+
+def _stage_worker(name, fn, inbox, outbox):
+    while True:
+        job = inbox.get()
+        if job is _STOP:
+            return
+        if not job.failed:
+            record_stage(job.claim, name)
+            try:
+                with metrics.use_run(job.run):
+                    fn(job)
+            except Exception as e:
+                job.failed_stage, job.error = name, str(e)
+        outbox(job)
+
+
+def run_stream(pdf_files, on_done=None, queue_size=None, force=False):
+    """
+    Processes `pdf_files` through extract -> summarize -> TTS -> Slack, with every stage
+    running in its own thread(s) and bounded queues in between. While one bulletin is
+    uploaded the next is synthesized and the one after that extracted, so the time per
+    bulletin approaches that of the slowest stage instead of the sum of all stages.
+
+    Each bulletin is claimed in the publish ledger before entering the pipeline; those
+    already published (unless `force`) or being processed elsewhere are skipped.
+    `on_done(job)` is called once per bulletin, in completion order, after its metrics
+    run record is written.
+
+    Returns:
+        dict: Counts of "done", "failed" and "skipped" bulletins.
+    """
+    queue_size = max(1, queue_size or STREAM_QUEUE_SIZE)
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    lock = threading.Lock()
+
+    def finish(job):
+        # Runs on the last stage's threads: it must never raise, or that stage would stop
+        # draining its queue and the whole pipeline would block.
+        try:
+            if job.workspace is not None:
+                job.workspace.cleanup()  # Jobs that failed before the upload stage still own their workspace.
+            if job.skipped:
+                status = "skipped"
+            else:
+                metrics.finish_run(job.run)
+                record_result(job.claim, not job.failed, job.failed_stage or "slack", job.error, job.slack_file_ids)
+                status = "failed" if job.failed else "done"
+        except Exception as e:
+            print(f"Error: could not finish {job.pdf_filepath}: {e}")
+            if not job.failed:
+                job.failed_stage, job.error = "finish", str(e)
+            status = "failed"
+        with lock:
+            counts[status] += 1
+        if on_done is not None:
+            try:
+                on_done(job)
+            except Exception as e:
+                print(f"Warning: on_done callback failed for {job.pdf_filepath}: {e}")
+
+    inboxes = [queue.Queue(maxsize=queue_size) for _ in STAGES]
+    stage_threads = []
+    for i, (name, fn, workers) in enumerate(STAGES):
+        outbox = inboxes[i + 1].put if i + 1 < len(STAGES) else finish
+        threads = [
+            threading.Thread(target=_stage_worker, args=(name, fn, inboxes[i], outbox), name=f"stream-{name}-{n}",
+                             daemon=True)
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        stage_threads.append(threads)
+
+    for pdf_filepath in pdf_files:
+        job = Job(pdf_filepath)
+        job.claim = claim_bulletin(pdf_filepath, job.bulletin_number, force=force)
+        if job.claim is not None and not job.claim.acquired:
+            job.skipped = job.claim.previous_status
+            finish(job)
+            continue
+        inboxes[0].put(job)  # Blocks while the first stage is STREAM_QUEUE_SIZE jobs behind.
+
+    # Shut the stages down in order: once every thread of a stage has exited, all of its
+    # jobs are already in the next queue, ahead of that stage's stop markers.
+    for inbox, threads in zip(inboxes, stage_threads):
+        for _ in threads:
+            inbox.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Processa boletins em PDF em modo streaming (extração, resumo, TTS e envio sobrepostos).")
+    parser.add_argument("targets", nargs="+", help="PDFs, diretórios com PDFs ou padrões glob.")
+    parser.add_argument("--queue-size", type=int, default=STREAM_QUEUE_SIZE,
+                        help="Boletins em espera entre duas etapas.")
+    parser.add_argument("--force", action="store_true",
+                        help="Publica novamente os boletins que o registro de publicações indica como já enviados.")
+    args = parser.parse_args()
+    exit_on_sigterm()
+
+    print("--- Iniciando Open Insurance Slack Bot (modo streaming) ---")
+    if not check_slack_token():
+        sys.exit(1)
+
+    pdf_files = []
+    for target in args.targets:
+        pdf_files += [p for p in collect_pdf_files(target) if p not in pdf_files]
+    if not pdf_files:
+        print("Erro: Nenhum PDF encontrado. Saindo.")
+        sys.exit(1)
+    print(f"{len(pdf_files)} PDFs encontrados.")
+
+    started = time.monotonic()
+
+    def report(job):
+        if job.skipped:
+            label = f"skipped (publish ledger: {job.skipped})"
+        else:
+            label = "OK" if not job.failed else f"FAILED at {job.failed_stage}: {job.error}"
+        print(f"[{time.monotonic() - started:.1f}s] {os.path.basename(job.pdf_filepath)}: {label}")
+
+    counts = run_stream(pdf_files, on_done=report, queue_size=args.queue_size, force=args.force)
+    print(f"\n--- Streaming concluído: {counts['done']} ok, {counts['failed']} falhas, {counts['skipped']} ignorados "
+          f"em {time.monotonic() - started:.1f}s ---")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
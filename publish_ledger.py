@@ -0,0 +1,292 @@
+import os
+import hashlib
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from artifact_store import get_artifact_store
+
+# SQLite file recording every bulletin handled by the pipeline, keyed by bulletin number
+# and PDF SHA-256, so re-runs and overlapping batch/watcher jobs never publish twice.
+PUBLISH_LEDGER_PATH = os.getenv("PUBLISH_LEDGER_PATH", os.path.join(os.getcwd(), "publish_ledger.sqlite3"))
+
+# Set PUBLISH_LEDGER_ENABLED=false to process every bulletin as if it were new.
+PUBLISH_LEDGER_ENABLED = os.getenv("PUBLISH_LEDGER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# A "running" claim older than this (seconds) is considered abandoned by a crashed worker
+# and may be taken over (claims of dead processes on the same host are taken over at once).
+PUBLISH_CLAIM_TTL = int(os.getenv("PUBLISH_CLAIM_TTL", str(60 * 60)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    bulletin_number TEXT NOT NULL,
+    pdf_sha256 TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    slack_file_ids TEXT,
+    error TEXT,
+    PRIMARY KEY (bulletin_number, pdf_sha256)
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    bulletin_number TEXT NOT NULL,
+    pdf_sha256 TEXT NOT NULL,
+    target TEXT NOT NULL,
+    slack_file_id TEXT,
+    delivered_at REAL NOT NULL,
+    PRIMARY KEY (bulletin_number, pdf_sha256, target)
+);
+"""
+
+# Result of PublishLedger.claim(). `acquired` is False when the bulletin was already
+# delivered (previous_status "done") or another worker is on it ("running").
+LedgerClaim = namedtuple("LedgerClaim", ["bulletin_number", "pdf_sha256", "owner", "acquired", "previous_status"])
+
+
+def _new_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _owner_alive(owner):
+    """False when `owner` (see _new_owner) is a process on this host that no longer exists."""
+    try:
+        host, pid, _, _ = owner.rsplit(":", 3)
+        pid = int(pid)
+    except ValueError:
+        return True
+    if host != socket.gethostname():
+        return True  # Can't tell; the claim expires after PUBLISH_CLAIM_TTL.
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # e.g. PermissionError: the process exists but belongs to another user
+    return True
+
+
+class PublishLedger:
+    """
+    Persistent record of which bulletins were published, with per-stage status and the
+    Slack file IDs. claim() runs in an IMMEDIATE transaction, so concurrent threads and
+    processes sharing the file never both acquire the same (bulletin, PDF) pair.
+    """
+
+    def __init__(self, path=PUBLISH_LEDGER_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def claim(self, bulletin_number, pdf_sha256, force=False):
+        """
+        Marks the bulletin as "running" for a new owner, unless it was already delivered or
+        another live worker holds a claim younger than PUBLISH_CLAIM_TTL. With `force` both
+        are taken over (the previous owner's later updates are then ignored, see _update),
+        and the channels it was delivered to are forgotten so it is published to all again.
+
+        Returns:
+            LedgerClaim
+        """
+        owner = _new_owner()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT status, claimed_at, owner FROM publications WHERE bulletin_number = ? AND pdf_sha256 = ?",
+                (bulletin_number, pdf_sha256),
+            ).fetchone()
+            previous_status = row[0] if row else None
+            if (row and row[0] == "running" and not force and now - row[1] < PUBLISH_CLAIM_TTL
+                    and _owner_alive(row[2])):
+                conn.execute("ROLLBACK")
+                return LedgerClaim(bulletin_number, pdf_sha256, None, False, previous_status)
+            if row and row[0] == "done" and not force:
+                conn.execute("ROLLBACK")
+                return LedgerClaim(bulletin_number, pdf_sha256, None, False, previous_status)
+            if force:
+                conn.execute(
+                    "DELETE FROM deliveries WHERE bulletin_number = ? AND pdf_sha256 = ?",
+                    (bulletin_number, pdf_sha256),
+                )
+            if row:
+                conn.execute(
+                    "UPDATE publications SET status = 'running', stage = NULL, owner = ?, claimed_at = ?, "
+                    "updated_at = ?, attempts = attempts + 1, error = NULL "
+                    "WHERE bulletin_number = ? AND pdf_sha256 = ?",
+                    (owner, now, now, bulletin_number, pdf_sha256),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO publications (bulletin_number, pdf_sha256, status, owner, claimed_at, updated_at) "
+                    "VALUES (?, ?, 'running', ?, ?, ?)",
+                    (bulletin_number, pdf_sha256, owner, now, now),
+                )
+            conn.execute("COMMIT")
+            return LedgerClaim(bulletin_number, pdf_sha256, owner, True, previous_status)
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, claim, assignments, values):
+        # Only the current owner may update the row, so a worker whose claim expired and
+        # was taken over cannot overwrite the new owner's progress.
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE publications SET {assignments}, updated_at = ? "
+                "WHERE bulletin_number = ? AND pdf_sha256 = ? AND owner = ?",
+                (*values, time.time(), claim.bulletin_number, claim.pdf_sha256, claim.owner),
+            )
+
+    def set_stage(self, claim, stage):
+        self._update(claim, "stage = ?", (stage,))
+
+    def finish(self, claim, ok, stage=None, error=None, slack_file_ids=None):
+        """Records the outcome: "done" with the Slack file IDs, or "failed" at `stage` with `error`."""
+        self._update(
+            claim,
+            "status = ?, stage = ?, error = ?, slack_file_ids = ?",
+            ("done" if ok else "failed", stage, error, json.dumps(slack_file_ids) if slack_file_ids else None),
+        )
+
+    def add_delivery(self, claim, target, slack_file_id=None):
+        """Records that the bulletin reached `target` (see slack_sender.target_key)."""
+        # Not owner-guarded: the message was posted either way, and a retry must not repeat it.
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO deliveries (bulletin_number, pdf_sha256, target, slack_file_id, delivered_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (claim.bulletin_number, claim.pdf_sha256, target, slack_file_id, time.time()),
+            )
+
+    def deliveries(self, bulletin_number, pdf_sha256):
+        """Returns target -> Slack file ID for every channel the bulletin was delivered to."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT target, slack_file_id FROM deliveries WHERE bulletin_number = ? AND pdf_sha256 = ?",
+                (bulletin_number, pdf_sha256),
+            ).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    def get(self, bulletin_number, pdf_sha256):
+        """Returns the ledger entry as a dict, or None if the bulletin was never claimed."""
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM publications WHERE bulletin_number = ? AND pdf_sha256 = ?",
+                (bulletin_number, pdf_sha256),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["slack_file_ids"] = json.loads(entry["slack_file_ids"]) if entry["slack_file_ids"] else []
+        return entry
+
+
+_ledger = None
+
+
+def get_publish_ledger():
+    """Returns the shared PublishLedger, or None when the ledger is disabled or unusable."""
+    global _ledger
+    if not PUBLISH_LEDGER_ENABLED:
+        return None
+    if _ledger is None:
+        try:
+            _ledger = PublishLedger()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: publish ledger unavailable at {PUBLISH_LEDGER_PATH}: {e}")
+            return None
+    return _ledger
+
+
+def _pdf_sha256(pdf_filepath):
+    store = get_artifact_store()
+    if store is not None:
+        return store.file_sha256(pdf_filepath)  # Reuses the artifact store's mtime/size hash cache.
+    digest = hashlib.sha256()
+    with open(pdf_filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def claim_bulletin(pdf_filepath, bulletin_number, force=False):
+    """
+    Claims a bulletin in the shared ledger before any work is done on it.
+
+    Returns:
+        LedgerClaim, or None when the ledger is disabled or unusable (the caller then
+        proceeds without deduplication).
+    """
+    ledger = get_publish_ledger()
+    if ledger is None:
+        return None
+    try:
+        return ledger.claim(bulletin_number, _pdf_sha256(pdf_filepath), force=force)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: publish ledger claim failed, processing without deduplication: {e}")
+        return None
+
+
+def record_stage(claim, stage):
+    """Records that `claim`'s bulletin entered `stage` (no-op without a ledger claim)."""
+    if claim is None or not claim.acquired:
+        return
+    try:
+        get_publish_ledger().set_stage(claim, stage)
+    except sqlite3.Error as e:
+        print(f"Warning: could not update the publish ledger: {e}")
+
+
+def record_result(claim, ok, stage=None, error=None, slack_file_ids=None):
+    """Records the final outcome of `claim`'s bulletin (no-op without a ledger claim)."""
+    if claim is None or not claim.acquired:
+        return
+    try:
+        get_publish_ledger().finish(claim, ok, stage, error, slack_file_ids)
+    except sqlite3.Error as e:
+        print(f"Warning: could not update the publish ledger: {e}")
+
+
+def delivered_targets(claim):
+    """Returns target -> Slack file ID for the channels `claim`'s bulletin already reached ({} without a claim)."""
+    if claim is None or not claim.acquired:
+        return {}
+    try:
+        return get_publish_ledger().deliveries(claim.bulletin_number, claim.pdf_sha256)
+    except sqlite3.Error as e:
+        print(f"Warning: could not read the publish ledger: {e}")
+        return {}
+
+
+def record_delivery(claim, target, slack_file_id=None):
+    """Records that `claim`'s bulletin reached `target` (no-op without a ledger claim)."""
+    if claim is None or not claim.acquired:
+        return
+    try:
+        get_publish_ledger().add_delivery(claim, target, slack_file_id)
+    except sqlite3.Error as e:
+        print(f"Warning: could not update the publish ledger: {e}")
@@ -0,0 +1,112 @@
+import os
+import random
+import time
+
+# Shared retry policy for the external APIs (Google TTS and Slack).
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))  # seconds
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30.0"))  # seconds
+
+# Overall time budget for one operation (all chunks of a TTS run, or one Slack send),
+# including the time spent waiting between retries.
+RETRY_DEADLINE_SECONDS = float(os.getenv("RETRY_DEADLINE_SECONDS", "300"))
+
+# gRPC status codes that signal a transient condition on Google's side.
+_RETRYABLE_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED"}
+
+# Slack Web API error strings that are worth retrying.
+_RETRYABLE_SLACK_ERRORS = {"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+
+
+class Deadline:
+    """A monotonic point in time shared by every call that belongs to the same operation."""
+
+    def __init__(self, seconds=RETRY_DEADLINE_SECONDS):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def _grpc_code_name(exc):
+    # google.api_core exceptions expose grpc_status_code; raw grpc.RpcError exposes code().
+    code = getattr(exc, "grpc_status_code", None)
+    if code is None and callable(getattr(exc, "code", None)):
+        try:
+            code = exc.code()
+        except Exception:
+            code = None
+    return getattr(code, "name", None)
+
+
+def _slack_response(exc):
+    # SlackApiError carries the SlackResponse (status_code, headers, data) as `response`.
+    response = getattr(exc, "response", None)
+    if response is not None and hasattr(response, "status_code"):
+        return response
+    return None
+
+
+def retry_after_seconds(exc):
+    """Returns the server-requested wait (Slack's Retry-After header), or None."""
+    response = _slack_response(exc)
+    if response is None:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    for name, value in headers.items():
+        if name.lower() == "retry-after":
+            try:
+                return float(value[0] if isinstance(value, (list, tuple)) else value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def is_retryable(exc):
+    """Decides whether `exc` is a transient failure worth another attempt."""
+    if _grpc_code_name(exc) in _RETRYABLE_GRPC_CODES:
+        return True
+    response = _slack_response(exc)
+    if response is not None:
+        status_code = response.status_code or 0
+        error = response.get("error") if hasattr(response, "get") else None
+        return status_code == 429 or status_code >= 500 or error in _RETRYABLE_SLACK_ERRORS
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, *args, description="call", deadline=None, max_attempts=RETRY_MAX_ATTEMPTS, **kwargs):
+    """
+    Calls `fn(*args, **kwargs)`, retrying transient failures with exponential backoff
+    and jitter. Slack's Retry-After is honored as a lower bound for the wait.
+
+    Gives up (re-raising the last error) when the error is not retryable, after
+    `max_attempts` attempts, or when the next wait would overrun `deadline`.
+    """
+    if deadline is None:
+        deadline = Deadline()
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except Exception as exc:
+            attempt += 1
+            if not is_retryable(exc) or attempt >= max_attempts:
+                raise
+            delay = backoff_delay(attempt - 1)
+            server_delay = retry_after_seconds(exc)
+            if server_delay is not None:
+                delay = max(delay, server_delay)
+            if delay >= deadline.remaining():
+                print(f"Warning: {description} failed and the retry deadline would be exceeded; giving up: {exc}")
+                raise
+            print(f"Warning: {description} failed ({exc}); retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{max_attempts})...")
+            time.sleep(delay)
@@ -1,8 +1,20 @@
 import os
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+import re
+import json
+import hashlib
+import threading
+import time
 import logging
-from typing import Optional # <--- ESSENCIAL: Importar Optional para type hinting em Python < 3.10
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, TYPE_CHECKING # <--- ESSENCIAL: Importar Optional para type hinting em Python < 3.10
+from retry_policy import Deadline, call_with_retry
+import metrics
+
+# slack_sdk is imported on first use so that importing this module (e.g. for
+# TARGET_CHANNEL_NAME or `main.py --check`) stays fast.
+if TYPE_CHECKING:
+    from slack_sdk import WebClient
 
 # Configure logging (optional but good practice)
 logging.basicConfig(level=logging.INFO)
@@ -18,29 +30,213 @@ logger = logging.getLogger(__name__)
 SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
 TARGET_CHANNEL_NAME = "podcastopin" # Canal fixo no código, ignorando variável de ambiente.
 
+# Optional pre-configured channel ID (e.g. C0123456789). When set, no channel lookup happens at all.
+SLACK_CHANNEL_ID = os.environ.get("SLACK_CHANNEL_ID")
+
+# Persisted name -> ID cache so each send doesn't have to list the workspace's channels.
+SLACK_CHANNEL_CACHE_PATH = os.environ.get(
+    "SLACK_CHANNEL_CACHE_PATH", os.path.join(os.getcwd(), ".slack_channel_cache.json")
+)
+SLACK_CHANNEL_CACHE_TTL = int(os.environ.get("SLACK_CHANNEL_CACHE_TTL", str(24 * 60 * 60)))  # seconds
+
+# Channels to publish to, comma-separated (default: TARGET_CHANNEL_NAME). Each entry is a
+# channel name or ID, optionally followed by "@ENV_VAR" naming the environment variable that
+# holds the bot token of another workspace, e.g. "podcastopin,diretoria,opin@SLACK_BOT_TOKEN_PARCEIRO".
+# The audio is uploaded once per workspace and shared to each of that workspace's channels separately.
+SLACK_TARGETS = os.environ.get("SLACK_TARGETS", "")
+
+# Base URL of the Slack Web API (e.g. a local stand-in such as benchmarks.fakes.FakeSlackServer).
+SLACK_API_BASE_URL = os.environ.get("SLACK_API_BASE_URL", "")
+
+# One channel to publish to and the bot token of its workspace.
+SlackTarget = namedtuple("SlackTarget", ["channel", "token"])
+
+# Outcome of publishing to one SlackTarget; `file_id` is shared by all channels of a workspace.
+PublishResult = namedtuple("PublishResult", ["target", "ok", "channel_id", "file_id", "error"])
+
+# Public/private channel (C/G) or direct message (D) IDs, used as-is without a lookup.
+_CHANNEL_ID_PATTERN = re.compile(r"^[CGD][A-Z0-9]{8,}$")
+
 # --- LINHA DE DEBBUGING ADICIONADA ---
 print(f"DEBUG: TARGET_CHANNEL_NAME lido: '{TARGET_CHANNEL_NAME}'")
 # --- FIM DA LINHA DE DEBUGGING ---
 
 
-def get_channel_id(client: WebClient, channel_name: str) -> Optional[str]: # <--- CORRIGIDO: str | None para Optional[str]
-    """Finds the Slack Channel ID for a given channel name."""
-    logger.info(f"Attempting to find Channel ID for '{channel_name}'...")
+_slack_clients: Dict[str, "WebClient"] = {}
+_slack_client_lock = threading.Lock()
+
+
+def get_slack_client(token: Optional[str] = None) -> "WebClient":
+    """
+    Returns the shared WebClient for `token` (default SLACK_BOT_TOKEN), created on first
+    use so long-running processes and repeated sends to a workspace reuse it.
+    """
+    token = token or SLACK_BOT_TOKEN
+    with _slack_client_lock:
+        client = _slack_clients.get(token)
+        if client is None:
+            from slack_sdk import WebClient
+            kwargs = {"base_url": SLACK_API_BASE_URL} if SLACK_API_BASE_URL else {}
+            client = _slack_clients[token] = WebClient(token=token, **kwargs)
+        return client
+
+
+def parse_targets(spec: Optional[str] = None) -> List[SlackTarget]:
+    """Parses a SLACK_TARGETS-style spec (default: SLACK_TARGETS, or TARGET_CHANNEL_NAME when unset)."""
+    spec = SLACK_TARGETS if spec is None else spec
+    targets = []
+    for entry in (spec or TARGET_CHANNEL_NAME).split(","):
+        entry = entry.strip().lstrip("#")
+        if not entry:
+            continue
+        channel, _, token_env = entry.partition("@")
+        token = os.environ.get(token_env.strip()) if token_env else SLACK_BOT_TOKEN
+        target = SlackTarget(channel.strip(), token)
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def _workspace_key(token: str) -> Optional[str]:
+    """Namespace for cached channel IDs: None for the default workspace (keeps existing cache entries)."""
+    if token == SLACK_BOT_TOKEN:
+        return None
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+
+
+def _channel_cache_key(channel_name: str, workspace: Optional[str]) -> str:
+    return channel_name if workspace is None else f"{workspace}/{channel_name}"
+
+
+def target_key(target: SlackTarget) -> str:
+    """Stable identifier of a target (channel plus workspace), e.g. for the publish ledger."""
+    workspace = _workspace_key(target.token) if target.token else None
+    return _channel_cache_key(target.channel, workspace)
+
+
+_channel_cache_lock = threading.Lock()
+
+
+def _timed_api_call(method, **kwargs):
+    """Calls a WebClient method, counting it and recording its latency (see metrics.py)."""
+    metrics.inc("slack_api_calls")
+    return metrics.timed_call("slack_api_seconds", method, **kwargs)
+
+
+def _load_channel_cache() -> dict:
+    try:
+        with open(SLACK_CHANNEL_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_channel_cache(cache: dict) -> None:
     try:
-        # Iterate through relevant channel types the bot might be in or have access to read
-        for channel_type in ["public_channel", "private_channel"]:
-            logger.debug(f"Checking channels of type: {channel_type}")
+        tmp_path = f"{SLACK_CHANNEL_CACHE_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, SLACK_CHANNEL_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Could not persist Slack channel cache to {SLACK_CHANNEL_CACHE_PATH}: {e}")
+
+
+def _get_cached_channel_id(channel_name: str, workspace: Optional[str] = None) -> Optional[str]:
+    with _channel_cache_lock:
+        entry = _load_channel_cache().get(_channel_cache_key(channel_name, workspace))
+    if entry and time.time() - entry.get("cached_at", 0) < SLACK_CHANNEL_CACHE_TTL:
+        return entry.get("id")
+    return None
+
+
+def _cache_channel_id(channel_name: str, channel_id: str, workspace: Optional[str] = None) -> None:
+    with _channel_cache_lock:
+        cache = _load_channel_cache()
+        cache[_channel_cache_key(channel_name, workspace)] = {"id": channel_id, "cached_at": time.time()}
+        _save_channel_cache(cache)
+
+
+def invalidate_channel_id(channel_name: str, workspace: Optional[str] = None) -> None:
+    """Drops a cached channel ID, e.g. after Slack answers channel_not_found."""
+    with _channel_cache_lock:
+        cache = _load_channel_cache()
+        if cache.pop(_channel_cache_key(channel_name, workspace), None) is not None:
+            _save_channel_cache(cache)
+            logger.info(f"Invalidated cached Channel ID for '{channel_name}'.")
+
+
+def get_channel_id(client: "WebClient", channel_name: str, workspace: Optional[str] = None) -> Optional[str]: # <--- CORRIGIDO: str | None para Optional[str]
+    """
+    Finds the Slack Channel ID for a given channel name.
+
+    Resolution order: the SLACK_CHANNEL_ID override (for TARGET_CHANNEL_NAME in the
+    default workspace), then the persisted cache (valid for SLACK_CHANNEL_CACHE_TTL
+    seconds), then a cursor-paginated conversations.list over public and private channels.
+    """
+    return get_channel_ids(client, [channel_name], workspace).get(channel_name)
+
+
+def get_channel_ids(client: "WebClient", channel_names: List[str], workspace: Optional[str] = None) -> Dict[str, str]:
+    """
+    Resolves several channel names of one workspace at once (see get_channel_id); names
+    missing from the cache are looked up in a single conversations.list walk that stops
+    as soon as all of them are found. Entries that already are channel IDs are returned as-is.
+
+    Returns:
+        dict: channel name -> channel ID, for the channels that were found.
+    """
+    found = {}
+    missing = set()
+    for channel_name in channel_names:
+        if SLACK_CHANNEL_ID and workspace is None and channel_name == TARGET_CHANNEL_NAME:
+            found[channel_name] = SLACK_CHANNEL_ID
+        elif _CHANNEL_ID_PATTERN.match(channel_name):
+            found[channel_name] = channel_name
+        else:
+            cached_id = _get_cached_channel_id(channel_name, workspace)
+            if cached_id:
+                logger.info(f"Using cached Channel ID: {cached_id} for name '{channel_name}'")
+                found[channel_name] = cached_id
+            else:
+                missing.add(channel_name)
+    if not missing:
+        return found
+
+    logger.info(f"Attempting to find Channel ID for {', '.join(repr(n) for n in sorted(missing))}...")
+    from slack_sdk.errors import SlackApiError
+    try:
+        cursor = None
+        pages = 0
+        deadline = Deadline()
+        while missing:
             # Note: conversations.list requires channels:read (public) or groups:read (private) scopes.
-            response = client.conversations_list(types=channel_type, limit=1000) # Increase limit if many channels
-            channels = response.get("channels", [])
-            for channel in channels:
-                if channel.get("name") == channel_name:
+            response = call_with_retry(
+                _timed_api_call,
+                client.conversations_list,
+                description="Slack conversations.list",
+                deadline=deadline,
+                types="public_channel,private_channel",
+                exclude_archived=True,
+                limit=200,  # Slack's recommended page size; larger pages are slower and rate-limited harder.
+                cursor=cursor,
+            )
+            pages += 1
+            for channel in response.get("channels", []):
+                channel_name = channel.get("name")
+                if channel_name in missing:
                     channel_id = channel.get("id")
-                    logger.info(f"Found Channel ID: {channel_id} for name '{channel_name}'")
-                    return channel_id
-        logger.error(f"Channel '{channel_name}' not found among the bot's accessible channels.")
-        logger.error("Ensure the bot is invited OR has necessary read permissions (channels:read/groups:read).")
-        return None
+                    logger.info(f"Found Channel ID: {channel_id} for name '{channel_name}' (after {pages} page(s))")
+                    _cache_channel_id(channel_name, channel_id, workspace)
+                    found[channel_name] = channel_id
+                    missing.discard(channel_name)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                break
+        for channel_name in sorted(missing):
+            logger.error(f"Channel '{channel_name}' not found among the bot's accessible channels.")
+        if missing:
+            logger.error("Ensure the bot is invited OR has necessary read permissions (channels:read/groups:read).")
+        return found
     except SlackApiError as e:
         # Check for missing scope error specifically
         if e.response.get("error") == "missing_scope":
@@ -49,67 +245,188 @@ def get_channel_id(client: WebClient, channel_name: str) -> Optional[str]: # <--
             logger.error("Please add the required scope(s) to your Slack App configuration.")
         else:
             logger.error(f"Error fetching channel list from Slack: {e.response['error']}")
-        return None
+        return found
     except Exception as e:
         logger.exception(f"An unexpected error occurred while fetching channel ID: {e}")
-        return None
+        return found
+
+def _share_to_channel(client: "WebClient", target: SlackTarget, channel_id: str, workspace: Optional[str],
+                      share) -> PublishResult:
+    """
+    Runs `share(channel_id)` (which returns the shared file's ID) for one target and
+    reports its own outcome. A stale cached ID (channel renamed/recreated) is dropped
+    and resolved again once.
+    """
+    from slack_sdk.errors import SlackApiError
+    for attempt in range(2):
+        try:
+            return PublishResult(target, True, channel_id, share(channel_id), None)
+        except SlackApiError as e:
+            error = e.response.get("error")
+            if error == "channel_not_found" and attempt == 0 and not _CHANNEL_ID_PATTERN.match(target.channel):
+                invalidate_channel_id(target.channel, workspace)
+                channel_id = get_channel_ids(client, [target.channel], workspace).get(target.channel)
+                if channel_id:
+                    continue
+            logger.error(f"Error sharing file to Slack channel '{target.channel}' (Channel ID {channel_id}): {error}")
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred while sharing to Slack channel '{target.channel}': {e}")
+            error = str(e)
+        return PublishResult(target, False, channel_id, None, error)
+
+
+def _publish_to_workspace(client: "WebClient", targets: List[SlackTarget], file_bytes: bytes, filename: str,
+                          title: str, initial_comment: str, thread_ts: Optional[str] = None) -> List[PublishResult]:
+    """
+    Uploads the file once (files.getUploadURLExternal + upload + files.completeUploadExternal)
+    and shares it to every channel in `targets`, which all belong to one workspace
+    (as a reply in the `thread_ts` thread, when given).
+
+    A single channel gets the file with the upload itself. With several channels the file
+    is uploaded without one and its permalink is posted to each channel concurrently
+    (Slack shows the file in the message), so a channel that fails (not found, bot not
+    invited, archived) does not affect the others and each result is that channel's own.
+    """
+    workspace = _workspace_key(targets[0].token)
+    channel_ids = get_channel_ids(client, [target.channel for target in targets], workspace)
+    results = {t: PublishResult(t, False, None, None, "channel_not_found") for t in targets if t.channel not in channel_ids}
+    shared = [t for t in targets if t.channel in channel_ids]
+
+    def upload(channel_id=None):
+        # Transient failures (429 with Retry-After, 5xx) are retried per retry_policy.py.
+        kwargs = {"channel": channel_id, "initial_comment": initial_comment, "thread_ts": thread_ts} if channel_id else {}
+        response = call_with_retry(
+            _timed_api_call,
+            client.files_upload_v2,
+            description="Slack files_upload_v2",
+            deadline=Deadline(),
+            file=file_bytes,
+            filename=filename,
+            title=title,
+            **kwargs,
+        )
+        return response.get("file") or {}
+
+    if len(shared) == 1:
+        target = shared[0]
+        logger.info(f"Uploading audio file: {filename} to Channel ID: {channel_ids[target.channel]}...")
+        results[target] = _share_to_channel(client, target, channel_ids[target.channel], workspace,
+                                            lambda channel_id: upload(channel_id).get("id"))
+    elif shared:
+        try:
+            logger.info(f"Uploading audio file: {filename} to share with {len(shared)} channels...")
+            file_info = upload()
+            permalink = file_info.get("permalink")
+            if not permalink:
+                permalink = _timed_api_call(client.files_info, file=file_info["id"])["file"]["permalink"]
+        except Exception as e:
+            logger.exception(f"Error uploading file to Slack: {e}")
+            error = e.response.get("error") if hasattr(e, "response") and hasattr(e.response, "get") else str(e)
+            results.update({t: PublishResult(t, False, channel_ids[t.channel], None, error) for t in shared})
+        else:
+            def post(channel_id):
+                call_with_retry(
+                    _timed_api_call,
+                    client.chat_postMessage,
+                    description="Slack chat.postMessage",
+                    deadline=Deadline(),
+                    channel=channel_id,
+                    text=f"{initial_comment}\n{permalink}",
+                    thread_ts=thread_ts,
+                )
+                return file_info.get("id")
+
+            with ThreadPoolExecutor(max_workers=min(len(shared), 8)) as executor:
+                futures = {
+                    t: metrics.submit_in_context(executor, _share_to_channel, client, t, channel_ids[t.channel],
+                                                 workspace, post)
+                    for t in shared
+                }
+                results.update({t: future.result() for t, future in futures.items()})
+    return [results[t] for t in targets]
 
-def send_to_slack(audio_file_path, bulletin_number, initial_comment):
+
+def publish_to_slack(audio_file_path, bulletin_number, initial_comment, targets: Optional[List[SlackTarget]] = None,
+                     clients: Optional[Dict[str, "WebClient"]] = None, thread_ts: Optional[str] = None) -> List[PublishResult]:
     """
-    Uploads an audio file and posts a message to a Slack channel using its ID.
+    Publishes an audio file to several channels, possibly in several workspaces.
+
+    The file is read once and uploaded once per workspace (targets are grouped by bot
+    token), then shared to all of that workspace's channels; workspaces are handled
+    concurrently with their pooled WebClients.
 
     Args:
         audio_file_path (str): The absolute path to the audio file to upload.
-        bulletin_number (str): The bulletin number (extracted previously).
-        initial_comment (str): The initial message text to post with the file.
-                               This will be formatted with the bulletin number.
+        bulletin_number (str): The bulletin number, used in the file title.
+        initial_comment (str): The message posted with the file (already formatted).
+        targets (list[SlackTarget], optional): Defaults to parse_targets().
+        clients (dict, optional): token -> WebClient overrides; defaults to get_slack_client(token).
+        thread_ts (str, optional): Posts the file as a reply in this thread (single-channel targets).
 
     Returns:
-        bool: True if successful, False otherwise.
+        list[PublishResult]: One result per target, in the order of `targets`.
     """
-    logger.info(f"--- Sending to Slack Channel Name: {TARGET_CHANNEL_NAME} ---")
-
-    if not SLACK_BOT_TOKEN:
-        logger.error("SLACK_BOT_TOKEN environment variable not set.")
-        logger.error("Please create a Slack App, get the Bot Token (xoxb-...), and set the environment variable.")
-        return False
+    targets = parse_targets() if targets is None else targets
+    logger.info(f"--- Sending to Slack Channel(s): {', '.join(t.channel for t in targets)} ---")
 
     if not os.path.exists(audio_file_path):
         logger.error(f"Audio file not found at {audio_file_path}")
-        return False
+        return [PublishResult(t, False, None, None, "file_not_found") for t in targets]
+    with open(audio_file_path, "rb") as f:
+        file_bytes = f.read()
 
-    client = WebClient(token=SLACK_BOT_TOKEN)
+    by_token = {}
+    results = []
+    for target in targets:
+        if target.token:
+            by_token.setdefault(target.token, []).append(target)
+        else:
+            logger.error(f"No Slack bot token set for channel '{target.channel}'.")
+            logger.error("Please create a Slack App, get the Bot Token (xoxb-...), and set the environment variable.")
+            results.append(PublishResult(target, False, None, None, "not_authed"))
 
-    # --- Get Channel ID --- 
-    channel_id = get_channel_id(client, TARGET_CHANNEL_NAME)
-    if not channel_id:
-        logger.error("Failed to find Channel ID. Cannot send message.")
-        return False
-    # ---
+    filename = os.path.basename(audio_file_path)
+    title = f"Resumo Boletim Open Insurance {bulletin_number}"
+    clients = clients or {}
+    if by_token:
+        with ThreadPoolExecutor(max_workers=len(by_token)) as executor:
+            futures = [
+                metrics.submit_in_context(executor, _publish_to_workspace, clients.get(token) or get_slack_client(token),
+                                          workspace_targets, file_bytes, filename, title, initial_comment, thread_ts)
+                for token, workspace_targets in by_token.items()
+            ]
+            for future in futures:
+                results.extend(future.result())
 
-    # --- CORREÇÃO AQUI: Use initial_comment diretamente, pois já vem formatado do main.py ---
-    # formatted_comment = initial_comment.format(numero_boletim=bulletin_number) # LINHA REMOVIDA/MODIFICADA
-    formatted_comment = initial_comment # Use a string já formatada
+    order = {target: i for i, target in enumerate(targets)}
+    results.sort(key=lambda r: order[r.target])
+    for result in results:
+        status = "ok" if result.ok else f"failed ({result.error})"
+        logger.info(f"Slack channel '{result.target.channel}': {status}")
+    return results
 
-    try:
-        logger.info(f"Uploading audio file: {audio_file_path} to Channel ID: {channel_id}...")
-        response = client.files_upload_v2(
-            channel=channel_id, # Use Channel ID here
-            file=audio_file_path,
-            initial_comment=formatted_comment, # Use a string já formatada aqui
-            title=f"Resumo Boletim Open Insurance {bulletin_number}" # O título do arquivo ainda usa o numero_boletim
-        )
-        logger.info("File uploaded successfully.")
-        return True
 
-    except SlackApiError as e:
-        logger.error(f"Error uploading file or sending message to Slack (using Channel ID {channel_id}): {e.response['error']}")
-        # More detailed error info can be found in e.response
-        # logger.error(f"Full Slack API Error Response: {e.response}")
-        return False
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred during Slack interaction: {e}")
-        return False
+def send_to_slack(audio_file_path, bulletin_number, initial_comment, client: Optional["WebClient"] = None,
+                  targets: Optional[List[SlackTarget]] = None):
+    """
+    Uploads an audio file and posts a message to the configured Slack channel(s)
+    (SLACK_TARGETS, default TARGET_CHANNEL_NAME); see publish_to_slack.
+
+    Args:
+        audio_file_path (str): The absolute path to the audio file to upload.
+        bulletin_number (str): The bulletin number (extracted previously).
+        initial_comment (str): The initial message text to post with the file.
+                               This will be formatted with the bulletin number.
+        client (WebClient, optional): Client to use for the default workspace; defaults to the shared get_slack_client().
+        targets (list[SlackTarget], optional): Defaults to parse_targets().
+
+    Returns:
+        bool: True if the file reached every channel, False otherwise.
+    """
+    # --- CORREÇÃO AQUI: Use initial_comment diretamente, pois já vem formatado do main.py ---
+    clients = {SLACK_BOT_TOKEN: client} if client is not None and SLACK_BOT_TOKEN else None
+    results = publish_to_slack(audio_file_path, bulletin_number, initial_comment, targets=targets, clients=clients)
+    return bool(results) and all(result.ok for result in results)
 
 # Example usage (for testing)
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import urllib.request
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from slack_sdk.signature import SignatureVerifier
+
+from main import process_bulletin, check_slack_token
+from slack_sender import get_slack_client, SlackTarget, SLACK_BOT_TOKEN
+from watcher import warm_up, WATCH_INBOX_DIR
+from workspace import JobWorkspace, exit_on_sigterm
+
+# Signing secret of the Slack app ("Basic Information" page); every request must carry
+# a valid X-Slack-Signature for it, or it is rejected.
+SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET", "")
+
+SLACK_SERVICE_HOST = os.getenv("SLACK_SERVICE_HOST", "0.0.0.0")
+SLACK_SERVICE_PORT = int(os.getenv("SLACK_SERVICE_PORT", "3000"))
+
+# Bulletins processed at the same time, and requests waiting for a worker. When the
+# queue is full new requests are turned down right away instead of delaying the reply.
+SLACK_SERVICE_WORKERS = int(os.getenv("SLACK_SERVICE_WORKERS", "2"))
+SLACK_SERVICE_QUEUE_SIZE = int(os.getenv("SLACK_SERVICE_QUEUE_SIZE", "20"))
+
+# Where `/boletim <nome>` looks for the PDF (and its processed/ subdirectory, see watcher.py).
+SLACK_SERVICE_PDF_DIR = os.getenv("SLACK_SERVICE_PDF_DIR", WATCH_INBOX_DIR)
+
+# PDFs shared in a channel larger than this are not downloaded.
+SLACK_SERVICE_MAX_PDF_BYTES = int(os.getenv("SLACK_SERVICE_MAX_PDF_BYTES", str(50 * 1024 * 1024)))
+
+_MAX_REQUEST_BYTES = 1024 * 1024
+_SEEN_EVENTS_LIMIT = 1000
+_STOP = object()
+
+# One requested summary. Slash commands name a local PDF (`pdf_filepath`) and get a new
+# thread; PDFs shared in a channel (`file`, a Slack file object) are answered in their thread.
+ServiceJob = namedtuple("ServiceJob", ["name", "channel", "thread_ts", "user", "pdf_filepath", "file"])
+
+
+def _is_pdf(file_info):
+    return file_info.get("mimetype") == "application/pdf" or file_info.get("name", "").lower().endswith(".pdf")
+
+
+class SlackService:
+    """
+    HTTP endpoint for the Slack app: `/boletim` slash commands (POST /slack/commands)
+    and PDFs shared in channels the bot is in (Events API, POST /slack/events).
+
+    Requests are verified and answered immediately (Slack expects a reply within 3
+    seconds); the work goes to a bounded queue served by a pool of worker threads that
+    run the regular pipeline (main.process_bulletin) with the warm TTS/Slack clients
+    and post the audio back in the request's thread.
+    """
+
+    def __init__(self, signing_secret=SLACK_SIGNING_SECRET, workers=SLACK_SERVICE_WORKERS,
+                 queue_size=SLACK_SERVICE_QUEUE_SIZE, pdf_dir=SLACK_SERVICE_PDF_DIR, client=None, token=None):
+        self.verifier = SignatureVerifier(signing_secret)
+        self.jobs = queue.Queue(maxsize=max(1, queue_size))
+        self.pdf_dir = pdf_dir
+        self.token = token or SLACK_BOT_TOKEN
+        self.client = client or get_slack_client(self.token)
+        self._seen_events = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"slack-service-{n}", daemon=True) for n in range(max(1, workers))
+        ]
+        self._httpd = None
+
+    # --- Acknowledgement path: no Slack API calls, no file I/O beyond a stat ---
+
+    def _enqueue(self, job):
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            print(f"Service busy: dropping request for {job.name} ({self.jobs.qsize()} queued).")
+            return False
+        return True
+
+    def _find_pdf(self, name):
+        for directory in (self.pdf_dir, os.path.join(self.pdf_dir, "processed")):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def handle_command(self, params):
+        """Handles a `/boletim <arquivo>` slash command; returns the (ephemeral) reply."""
+        text = (params.get("text") or "").strip()
+        if not text:
+            return {"response_type": "ephemeral", "text": "Uso: /boletim <boletim>, ex.: /boletim B25-021"}
+        name = os.path.basename(text.strip("\"'"))
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        pdf_filepath = self._find_pdf(name)
+        if pdf_filepath is None:
+            return {"response_type": "ephemeral", "text": f"Boletim {name} não encontrado."}
+        job = ServiceJob(name, params.get("channel_id"), None, params.get("user_id"), pdf_filepath, None)
+        if not self._enqueue(job):
+            return {"response_type": "ephemeral", "text": "Muitos pedidos em andamento; tente novamente em alguns minutos."}
+        return {"response_type": "ephemeral", "text": f"Gerando o resumo em áudio de {name}; ele será publicado neste canal."}
+
+    def _first_delivery(self, event_id):
+        # Slack redelivers events it considers unacknowledged; handle each event_id once.
+        if not event_id:
+            return True
+        with self._seen_lock:
+            if event_id in self._seen_events:
+                return False
+            self._seen_events[event_id] = True
+            while len(self._seen_events) > _SEEN_EVENTS_LIMIT:
+                self._seen_events.popitem(last=False)
+        return True
+
+    def handle_event(self, payload):
+        """Handles an Events API request; returns the JSON reply."""
+        if payload.get("type") == "url_verification":
+            return {"challenge": payload.get("challenge")}
+        if payload.get("type") != "event_callback" or not self._first_delivery(payload.get("event_id")):
+            return {}
+        event = payload.get("event") or {}
+        if event.get("type") != "message" or event.get("subtype") != "file_share" or event.get("bot_id"):
+            return {}
+        for file_info in event.get("files") or []:
+            if _is_pdf(file_info):
+                name = os.path.basename(file_info.get("name") or f"{file_info.get('id')}.pdf")
+                thread_ts = event.get("thread_ts") or event.get("ts")
+                self._enqueue(ServiceJob(name, event.get("channel"), thread_ts, event.get("user"), None, file_info))
+        return {}
+
+    # --- Workers ---
+
+    def _download(self, file_info, path):
+        url = file_info.get("url_private_download")
+        if not url:  # e.g. files shared from another workspace only carry the ID
+            url = self.client.files_info(file=file_info["id"])["file"]["url_private_download"]
+        request = urllib.request.Request(url, headers={"Authorization": f"Bearer {self.token}"})
+        size = 0
+        with urllib.request.urlopen(request, timeout=60) as response, open(path, "wb") as f:
+            for block in iter(lambda: response.read(1024 * 1024), b""):
+                size += len(block)
+                if size > SLACK_SERVICE_MAX_PDF_BYTES:
+                    raise ValueError(f"PDF larger than {SLACK_SERVICE_MAX_PDF_BYTES} bytes (SLACK_SERVICE_MAX_PDF_BYTES).")
+                f.write(block)
+        return path
+
+    def _reply(self, job, thread_ts, text):
+        try:
+            self.client.chat_postMessage(channel=job.channel, thread_ts=thread_ts, text=text)
+        except Exception as e:
+            print(f"Error: could not post to Slack channel {job.channel}: {e}")
+
+    def run_job(self, job):
+        """Runs the pipeline for one request and publishes the audio in its thread."""
+        thread_ts = job.thread_ts
+        try:
+            if thread_ts is None:
+                requested_by = f" (pedido por <@{job.user}>)" if job.user else ""
+                response = self.client.chat_postMessage(
+                    channel=job.channel, text=f"Gerando o resumo em áudio de {job.name}{requested_by}...")
+                thread_ts = response["ts"]
+            with JobWorkspace(job.name) as workspace:
+                pdf_filepath = job.pdf_filepath or self._download(job.file, workspace.file(job.name))
+                success = process_bulletin(pdf_filepath, targets=[SlackTarget(job.channel, self.token)],
+                                           thread_ts=thread_ts)
+        except Exception as e:
+            print(f"Error: request for {job.name} failed: {e}")
+            success = False
+        if not success:
+            self._reply(job, thread_ts, f"Não foi possível gerar o resumo em áudio de {job.name}.")
+        return success
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is _STOP:
+                return
+            self.run_job(job)
+
+    # --- HTTP server ---
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._send(200, {"ok": True, "queued": service.jobs.qsize()})
+                else:
+                    self._send(404, {"ok": False})
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._send(400, {"ok": False, "error": "invalid_content_length"})
+                    return
+                if length > _MAX_REQUEST_BYTES:
+                    self._send(413, {"ok": False})
+                    return
+                body = self.rfile.read(length)
+                if not service.verifier.is_valid(body=body,
+                                                 timestamp=self.headers.get("X-Slack-Request-Timestamp", ""),
+                                                 signature=self.headers.get("X-Slack-Signature", "")):
+                    self._send(401, {"ok": False, "error": "invalid_signature"})
+                    return
+                try:
+                    if self.path == "/slack/commands":
+                        params = {k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()}
+                        self._send(200, service.handle_command(params))
+                    elif self.path == "/slack/events":
+                        self._send(200, service.handle_event(json.loads(body)))
+                    else:
+                        self._send(404, {"ok": False})
+                except ValueError:
+                    self._send(400, {"ok": False, "error": "invalid_payload"})
+
+        return Handler
+
+    def start(self, host=SLACK_SERVICE_HOST, port=SLACK_SERVICE_PORT):
+        """Starts the workers and the HTTP server (in a background thread); returns the bound (host, port)."""
+        for worker in self._workers:
+            worker.start()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        threading.Thread(target=self._httpd.serve_forever, name="slack-service-http", daemon=True).start()
+        return self._httpd.server_address
+
+    def stop(self):
+        """Stops accepting requests and lets the workers finish the jobs already queued."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for _ in self._workers:
+            self.jobs.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serviço HTTP para o app do Slack: comando /boletim e PDFs compartilhados nos canais.")
+    parser.add_argument("--host", default=SLACK_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SLACK_SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SLACK_SERVICE_WORKERS,
+                        help="Boletins processados ao mesmo tempo.")
+    args = parser.parse_args()
+    exit_on_sigterm()
+
+    print("--- Iniciando Open Insurance Slack Bot (modo serviço) ---")
+    if not check_slack_token():
+        sys.exit(1)
+    if not SLACK_SIGNING_SECRET:
+        print("Erro: SLACK_SIGNING_SECRET não está definido. Saindo.")
+        sys.exit(1)
+
+    warm_up()
+    service = SlackService(workers=args.workers)
+    host, port = service.start(args.host, args.port)
+    print(f"Ouvindo em http://{host}:{port} (/slack/commands, /slack/events).")
+    try:
+        threading.Event().wait()
+    except (KeyboardInterrupt, SystemExit):
+        print("\nServiço interrompido. Aguardando os pedidos em andamento...")
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,219 @@
 # summarize_text.py
 
-# NLTK data path configuration (important for environments where default path might not work)
-import nltk
+# This module (Sumy, NLTK, NumPy) is only imported when a summary is actually needed
+# (see artifact_store.summarize_cached). NLTK data is never downloaded at runtime: see nlp_setup.py.
 import os
-if not os.path.exists("/home/ubuntu/nltk_data"):
-    nltk.download("punkt", download_dir="/home/ubuntu/nltk_data")
-nltk.data.path.append("/home/ubuntu/nltk_data")
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 from sumy.parsers.plaintext import PlaintextParser
 from sumy.nlp.tokenizers import Tokenizer
 from sumy.summarizers.lsa import LsaSummarizer as Summarizer # Using LSA
 from sumy.nlp.stemmers import Stemmer
 from sumy.utils import get_stop_words
+import numpy # Listed in requirements.txt; Sumy only imports it optionally
+
+from nlp_setup import ensure_nltk_data
 
 LANGUAGE = "portuguese" # Assuming bulletins are in Portuguese
 SENTENCES_COUNT = 7      # Number of sentences in the summary (adjust as needed)
 
+# Summarization algorithm:
+# - "lsa": Sumy's LSA (full SVD; best kept for short texts)
+# - "fast-lsa": sparse TF-IDF matrix + randomized truncated SVD (scales to long bulletins)
+# - "textrank": TextRank over the sparse sentence-similarity graph
+# - "auto" (default): "lsa" for short texts, "fast-lsa" from SUMMARY_FAST_MIN_SENTENCES sentences on
+SUMMARY_ALGORITHM = os.getenv("SUMMARY_ALGORITHM", "auto").lower()
+SUMMARY_FAST_MIN_SENTENCES = int(os.getenv("SUMMARY_FAST_MIN_SENTENCES", "300"))
+
+# Input beyond this many characters is ignored (cut at the last sentence end before the cap).
+SUMMARY_MAX_INPUT_CHARS = int(os.getenv("SUMMARY_MAX_INPUT_CHARS", "400000"))
+
+# With PDF_EXTRACT_MODE=structured, summarize each section on its own (SENTENCES_COUNT split
+# across sections by length) instead of the whole bulletin at once.
+SUMMARY_PER_SECTION = os.getenv("SUMMARY_PER_SECTION", "false").lower() in ("1", "true", "yes")
+# Sections are summarized in worker processes when the bulletin has at least this many characters.
+SUMMARY_PARALLEL_MIN_CHARS = int(os.getenv("SUMMARY_PARALLEL_MIN_CHARS", "200000"))
+SUMMARY_SECTION_WORKERS = int(os.getenv("SUMMARY_SECTION_WORKERS", str(os.cpu_count() or 1)))
+
+def summary_params():
+    """Identifies the summarizer configuration, for caching summaries (see artifact_store.py)."""
+    params = f"{SUMMARY_ALGORITHM}:{LANGUAGE}:{SENTENCES_COUNT}:{SUMMARY_FAST_MIN_SENTENCES}:{SUMMARY_MAX_INPUT_CHARS}"
+    return f"{params}:per-section" if SUMMARY_PER_SECTION else params
+
+
+@lru_cache(maxsize=1)
+def get_summarizer():
+    """
+    Builds the tokenizer and the LSA summarizer (with stemmer and stop words) once
+    and reuses them on every call, so long-running processes keep them warm.
+
+    Returns:
+        tuple: (Tokenizer, Summarizer)
+    """
+    ensure_nltk_data()
+    tokenizer = Tokenizer(LANGUAGE)
+    summarizer = Summarizer(Stemmer(LANGUAGE))
+    summarizer.stop_words = get_stop_words(LANGUAGE)
+    return tokenizer, summarizer
+
+
+@lru_cache(maxsize=1)
+def _get_term_normalizer():
+    """Returns a memoized word -> stemmed term function (None for stop words), shared across calls."""
+    stemmer = Stemmer(LANGUAGE)
+    stop_words = frozenset(get_stop_words(LANGUAGE))
+
+    @lru_cache(maxsize=200000)
+    def normalize(word):
+        word = word.lower()
+        if word in stop_words:
+            return None
+        return stemmer(word)
+
+    return normalize
+
+
+def _cap_input(text):
+    if len(text) <= SUMMARY_MAX_INPUT_CHARS:
+        return text
+    cut = text.rfind(".", 0, SUMMARY_MAX_INPUT_CHARS)
+    cut = cut + 1 if cut > 0 else SUMMARY_MAX_INPUT_CHARS
+    print(f"Warning: Input truncated from {len(text)} to {cut} chars for summarization (SUMMARY_MAX_INPUT_CHARS).")
+    return text[:cut]
+
+
+def _tfidf_matrix(sentences):
+    """
+    Builds the term x sentence TF-IDF matrix in coordinate form, with each
+    sentence column L2-normalized.
+
+    Returns:
+        tuple: (rows, cols, values, n_terms), or None if no sentence has any term.
+    """
+    normalize = _get_term_normalizer()
+    tokenizer, _ = get_summarizer()
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for j, sentence in enumerate(sentences):
+        term_counts = {}
+        for word in tokenizer.to_words(sentence):
+            term = normalize(word)
+            if term:
+                index = vocabulary.setdefault(term, len(vocabulary))
+                term_counts[index] = term_counts.get(index, 0) + 1
+        for index, count in term_counts.items():
+            rows.append(index)
+            cols.append(j)
+            counts.append(count)
+    if not vocabulary:
+        return None
+
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    cols = numpy.asarray(cols, dtype=numpy.int64)
+    tf = numpy.asarray(counts, dtype=numpy.float64)
+    n_terms, n_sentences = len(vocabulary), len(sentences)
+    document_frequency = numpy.bincount(rows, minlength=n_terms)
+    idf = numpy.log((1 + n_sentences) / (1 + document_frequency)) + 1
+    values = tf * idf[rows]
+    norms = numpy.sqrt(numpy.bincount(cols, weights=values ** 2, minlength=n_sentences))
+    values /= numpy.where(norms > 0, norms, 1)[cols]
+    return rows, cols, values, n_terms
+
+
+def _spmm(out_index, in_index, values, n_out, dense):
+    """Multiplies a coordinate-form sparse matrix by a dense matrix, one output column at a time."""
+    result = numpy.empty((n_out, dense.shape[1]))
+    for k in range(dense.shape[1]):
+        result[:, k] = numpy.bincount(out_index, weights=values * dense[in_index, k], minlength=n_out)
+    return result
+
+
+def _rank_fast_lsa(sentences):
+    """Scores sentences with a randomized truncated SVD of the TF-IDF matrix (Steinberger & Jezek ranking)."""
+    matrix = _tfidf_matrix(sentences)
+    if matrix is None:
+        return None
+    rows, cols, values, n_terms = matrix
+    n_sentences = len(sentences)
+    rank = min(max(3, SENTENCES_COUNT), n_terms, n_sentences)
+    width = min(rank + 10, n_terms, n_sentences)
+
+    rng = numpy.random.default_rng(0)  # Fixed seed so the same input always yields the same summary.
+    y = _spmm(rows, cols, values, n_terms, rng.standard_normal((n_sentences, width)))
+    for _ in range(2):  # Power iterations sharpen the spectrum for text matrices.
+        q, _ = numpy.linalg.qr(y)
+        z, _ = numpy.linalg.qr(_spmm(cols, rows, values, n_sentences, q))
+        y = _spmm(rows, cols, values, n_terms, z)
+    q, _ = numpy.linalg.qr(y)
+    b = _spmm(cols, rows, values, n_sentences, q).T  # Q^T A, shape (width, n_sentences)
+    _, sigma, vt = numpy.linalg.svd(b, full_matrices=False)
+    sigma, vt = sigma[:rank], vt[:rank]
+    return numpy.sqrt(((sigma[:, None] * vt) ** 2).sum(axis=0))
+
+
+def _rank_textrank(sentences, damping=0.85, iterations=50):
+    """Scores sentences with TextRank on the cosine-similarity graph, without materializing the graph."""
+    matrix = _tfidf_matrix(sentences)
+    if matrix is None:
+        return None
+    rows, cols, values, n_terms = matrix
+    n_sentences = len(sentences)
+
+    def similarity_times(vector):
+        # (A^T A - I) v: similarity to every other sentence (columns have unit norm).
+        by_term = _spmm(rows, cols, values, n_terms, vector[:, None])
+        return _spmm(cols, rows, values, n_sentences, by_term)[:, 0] - vector
+
+    degree = similarity_times(numpy.ones(n_sentences))
+    degree = numpy.where(degree > 1e-12, degree, 1)
+    scores = numpy.full(n_sentences, 1.0 / n_sentences)
+    for _ in range(iterations):
+        updated = (1 - damping) / n_sentences + damping * similarity_times(scores / degree)
+        if numpy.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def _summarize_sumy_lsa(text, sentences_count=SENTENCES_COUNT):
+    tokenizer, summarizer = get_summarizer()
+    parser = PlaintextParser.from_string(text, tokenizer)
+    return [str(sentence) for sentence in summarizer(parser.document, sentences_count)]
+
+
+def _summarize_ranked(text, rank_function, sentences_count=SENTENCES_COUNT):
+    tokenizer, _ = get_summarizer()
+    sentences = tokenizer.to_sentences(text)
+    if len(sentences) <= sentences_count:
+        return list(sentences)
+    scores = rank_function(sentences)
+    if scores is None:
+        return []
+    best = numpy.argsort(-scores, kind="stable")[:sentences_count]
+    return [sentences[i] for i in sorted(best)]  # Keep document order, like Sumy.
+
+
+_ALGORITHMS = {
+    "lsa": _summarize_sumy_lsa,
+    "fast-lsa": lambda text, count=SENTENCES_COUNT: _summarize_ranked(text, _rank_fast_lsa, count),
+    "textrank": lambda text, count=SENTENCES_COUNT: _summarize_ranked(text, _rank_textrank, count),
+}
+
+
+def _choose_algorithm(text):
+    if SUMMARY_ALGORITHM in _ALGORITHMS:
+        return SUMMARY_ALGORITHM
+    if SUMMARY_ALGORITHM != "auto":
+        print(f"Warning: Unknown SUMMARY_ALGORITHM '{SUMMARY_ALGORITHM}', using 'auto'.")
+    # Cheap sentence-count estimate; the full tokenization happens inside the algorithm.
+    estimated_sentences = text.count(". ") + text.count(".\n") + 1
+    return "fast-lsa" if estimated_sentences >= SUMMARY_FAST_MIN_SENTENCES else "lsa"
+
+
 def summarize(text):
     """
-    Summarizes the input text using the Sumy library (LSA algorithm).
+    Summarizes the input text with the configured algorithm (see SUMMARY_ALGORITHM).
 
     Args:
         text (str): The text content to summarize (extracted from PDF).
@@ -26,27 +221,17 @@ def summarize(text):
     Returns:
         str: The summarized text, or the original text if summarization fails.
     """
-    print(f"--- Running Summarizer (Sumy LSA - {SENTENCES_COUNT} sentences) ---")
     if not text:
         print("Warning: No text provided for summarization.")
         return "(Conteúdo vazio ou não extraído do boletim)"
 
     try:
-        # Initialize parser and tokenizer for the specified language
-        parser = PlaintextParser.from_string(text, Tokenizer(LANGUAGE))
-        stemmer = Stemmer(LANGUAGE)
-
-        # Initialize the LSA summarizer
-        summarizer = Summarizer(stemmer)
-        summarizer.stop_words = get_stop_words(LANGUAGE)
+        capped_text = _cap_input(text)
+        algorithm = _choose_algorithm(capped_text)
+        print(f"--- Running Summarizer ({algorithm} - {SENTENCES_COUNT} sentences) ---")
 
-        # Generate the summary
-        summary_sentences = []
-        for sentence in summarizer(parser.document, SENTENCES_COUNT):
-            summary_sentences.append(str(sentence))
-
-        # Join the sentences into a single string
-        summary = " ".join(summary_sentences)
+        # Generate the summary and join the sentences into a single string
+        summary = " ".join(_ALGORITHMS[algorithm](capped_text))
 
         if not summary:
             print("Warning: Summarization resulted in empty text. Returning original.")
@@ -56,13 +241,78 @@ def summarize(text):
         return summary
 
     except Exception as e:
-        print(f"Error during Sumy summarization: {e}")
+        print(f"Error during summarization: {e}")
         print("Falling back to original text.")
         # Optionally log the full traceback for debugging
         # import traceback
         # traceback.print_exc()
         return text # Fallback to original text on error
 
+def _allocate_sentences(lengths, total):
+    """Splits `total` summary sentences across sections proportionally to their length (largest remainder)."""
+    size = sum(lengths) or 1
+    shares = [total * length / size for length in lengths]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: counts[i] - shares[i])
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _summarize_section(body, sentences_count):
+    """Worker task: summarizes one section body (a top-level function, so it can run in a process pool)."""
+    return " ".join(_ALGORITHMS[_choose_algorithm(body)](body, sentences_count))
+
+
+def summarize_by_section(text):
+    """
+    Summarizes text produced by structured extraction (see pdf_processor.render_sections)
+    section by section: each section gets a share of SENTENCES_COUNT proportional to its
+    length, and its summary is prefixed with the section title. Large bulletins have their
+    sections summarized in parallel worker processes.
+
+    Falls back to summarize() when the text has fewer than two sections.
+    """
+    from pdf_processor import parse_sections
+
+    if not text:
+        return summarize(text)
+    sections = [(title, body) for title, body in parse_sections(_cap_input(text)) if body.strip()]
+    if len(sections) < 2:
+        return summarize(text)
+
+    try:
+        counts = _allocate_sentences([len(body) for _, body in sections], SENTENCES_COUNT)
+        work = [(title, body, count) for (title, body), count in zip(sections, counts) if count]
+        print(f"--- Running Summarizer (per section - {len(work)} of {len(sections)} sections, "
+              f"{SENTENCES_COUNT} sentences) ---")
+        bodies, sentence_counts = [body for _, body, _ in work], [count for _, _, count in work]
+        if len(text) >= SUMMARY_PARALLEL_MIN_CHARS and SUMMARY_SECTION_WORKERS > 1 and len(work) > 1:
+            with ProcessPoolExecutor(max_workers=min(SUMMARY_SECTION_WORKERS, len(work))) as executor:
+                section_summaries = list(executor.map(_summarize_section, bodies, sentence_counts))
+        else:
+            section_summaries = list(map(_summarize_section, bodies, sentence_counts))
+
+        parts = []
+        for (title, _, _), section_summary in zip(work, section_summaries):
+            if not section_summary:
+                continue
+            if title and not title.endswith((".", "!", "?", ":")):
+                title += "."
+            parts.append(f"{title} {section_summary}" if title else section_summary)
+        summary = "\n".join(parts)
+
+        if not summary:
+            print("Warning: Summarization resulted in empty text. Returning original.")
+            return text
+        print(f"Successfully summarized text (length: {len(summary)} chars).")
+        return summary
+
+    except Exception as e:
+        print(f"Error during per-section summarization: {e}")
+        print("Falling back to original text.")
+        return text
+
 # Example usage (for testing)
 if __name__ == "__main__":
     # Simulate longer text extracted from a PDF
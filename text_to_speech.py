@@ -1,10 +1,20 @@
+import io
 import os
-from google.cloud import texttospeech
-from google.oauth2 import service_account
-import nltk
-from nltk.tokenize import sent_tokenize
-from pydub import AudioSegment
-import uuid # Para gerar nomes de arquivo temporários únicos
+import re
+import shutil
+import subprocess
+import wave
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+from xml.sax.saxutils import escape as xml_escape
+from concurrent.futures import ThreadPoolExecutor
+from audio_cache import AudioCache, cache_max_bytes, make_cache_key, TTS_CACHE_ENABLED
+from retry_policy import Deadline, call_with_retry
+import metrics
+from nlp_setup import split_sentences
+from workspace import workspace_base_dir
 
 # --- Configurações (Agora lidas de variáveis de ambiente) ---
 # É altamente recomendável definir estas variáveis no ambiente de execução (Docker, Kubernetes, etc.)
@@ -22,26 +32,409 @@ KEY_FILE_PATH = os.getenv("KEY_FILE_PATH", _default_key_file_path_docker)
 # Definimos isso aqui para que a biblioteca `google-cloud-texttospeech` a encontre.
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = KEY_FILE_PATH
 
-# Caminho final onde o arquivo de áudio será salvo dentro do contêiner.
-# Se a variável de ambiente 'AUDIO_FILE_PATH' não estiver definida,
-# ele usará um caminho padrão dentro do contêiner Docker.
-_default_audio_file_path_docker = "/app/output/output_audio.mp3"
-AUDIO_FILE_PATH = os.getenv("AUDIO_FILE_PATH", _default_audio_file_path_docker)
+# Caminho fixo opcional para o arquivo de áudio, usado só quando quem chama convert_text_to_speech
+# não informa `output_path`. Sem ele, cada conversão grava em um arquivo com nome único
+# (ver workspace.py), para que execuções simultâneas nunca sobrescrevam o áudio umas das outras.
+# O pipeline (main.py, batch.py, pipeline_stream.py) sempre usa um diretório de trabalho por job.
+AUDIO_FILE_PATH = os.getenv("AUDIO_FILE_PATH", "")
+
+# Codificação pedida à API TTS: MP3 (padrão), LINEAR16 (WAV) ou OGG_OPUS.
+# Em todos os casos os chunks são unidos em memória, sem decodificar/re-codificar o áudio.
+TTS_AUDIO_ENCODING = os.getenv("TTS_AUDIO_ENCODING", "MP3").upper()
+_AUDIO_EXTENSIONS = {"MP3": ".mp3", "LINEAR16": ".wav", "OGG_OPUS": ".ogg"}
+
+# Perfil do arquivo de áudio final:
+# - "passthrough" (padrão): o áudio da API (TTS_AUDIO_ENCODING) é gravado como veio, sem re-encode.
+# - "mp3": MP3 mono em TTS_MP3_BITRATE.
+# - "opus-voice": Opus mono de baixa taxa (TTS_OPUS_BITRATE), otimizado para voz; o menor arquivo.
+# Os perfis com re-encode pedem PCM (LINEAR16) à API e codificam com o ffmpeg uma única vez,
+# à medida que os chunks chegam (sem decodificar um formato com perdas para gerar outro).
+TTS_AUDIO_PROFILE = os.getenv("TTS_AUDIO_PROFILE", "passthrough").lower()
+TTS_MP3_BITRATE = os.getenv("TTS_MP3_BITRATE", "64k")
+TTS_OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "24k")
+
+# Normalização de loudness (filtro loudnorm do ffmpeg) aplicada na mesma passada de encode.
+# Só vale para os perfis com re-encode.
+TTS_LOUDNORM = os.getenv("TTS_LOUDNORM", "false").lower() in ("1", "true", "yes")
+TTS_LOUDNORM_FILTER = os.getenv("TTS_LOUDNORM_FILTER", "loudnorm=I=-16:TP=-1.5:LRA=11")
+
+# Parâmetros repassados ao AudioConfig da API (0/vazio = padrão da API).
+TTS_SPEAKING_RATE = float(os.getenv("TTS_SPEAKING_RATE", "1.0"))
+TTS_SAMPLE_RATE_HERTZ = int(os.getenv("TTS_SAMPLE_RATE_HERTZ", "0"))
+TTS_EFFECTS_PROFILE_ID = [p.strip() for p in os.getenv("TTS_EFFECTS_PROFILE_ID", "").split(",") if p.strip()]
+
+# Como o áudio final é produzido: encoding pedido à API, extensão do arquivo e, para os
+# perfis com re-encode, os argumentos de codec do ffmpeg (None = gravar como veio da API).
+AudioProfile = namedtuple("AudioProfile", ["api_encoding", "extension", "ffmpeg_codec_args"])
+
+_ENCODED_PROFILES = {
+    "mp3": AudioProfile("LINEAR16", ".mp3", ["-c:a", "libmp3lame", "-b:a", TTS_MP3_BITRATE, "-f", "mp3"]),
+    "opus-voice": AudioProfile(
+        "LINEAR16", ".ogg", ["-c:a", "libopus", "-b:a", TTS_OPUS_BITRATE, "-application", "voip", "-f", "ogg"]
+    ),
+}
+
+# Número máximo de requisições simultâneas à API TTS (1 = modo sequencial).
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+
+# Limite de requisições por segundo enviadas à API TTS (0 = sem limite).
+# Útil para ficar abaixo da cota por minuto do projeto no Google Cloud.
+TTS_MAX_REQUESTS_PER_SECOND = float(os.getenv("TTS_MAX_REQUESTS_PER_SECOND", "0"))
+
+# Requisições TTS em andamento ao mesmo tempo no processo inteiro (padrão: TTS_MAX_WORKERS).
+# Este limite e o de requisições por segundo valem para todas as conversões somadas, e não para
+# cada uma, já que lote, streaming e o serviço do Slack fazem várias conversões em paralelo.
+TTS_MAX_IN_FLIGHT = int(os.getenv("TTS_MAX_IN_FLIGHT", str(TTS_MAX_WORKERS)))
+
+
+# A API Google TTS aceita no máximo 5000 bytes UTF-8 por requisição; deixamos uma margem de segurança.
+TTS_MAX_REQUEST_BYTES = 4900
 
-# Diretório temporário para armazenar os chunks de áudio.
-# Garante que seja um caminho absoluto baseado no diretório de trabalho do Docker.
-TEMP_AUDIO_DIR = os.path.join(os.getcwd(), "temp_audio_chunks")
+# Quando ativado, cada requisição é enviada como SSML com uma pausa (<break>) entre as frases
+# agrupadas, preservando o ritmo de leitura de quando cada frase era uma requisição separada.
+TTS_USE_SSML = os.getenv("TTS_USE_SSML", "false").lower() in ("1", "true", "yes")
+TTS_SENTENCE_BREAK_MS = int(os.getenv("TTS_SENTENCE_BREAK_MS", "400"))
+
+# Um chunk pronto para envio à API: o conteúdo e se ele deve ser enviado como SSML.
+TtsChunk = namedtuple("TtsChunk", ["content", "is_ssml"])
+
+_CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:])\s+|\s+(?=[—–-]\s)")
+
+
+def _byte_len(text, use_ssml):
+    return len((xml_escape(text) if use_ssml else text).encode('utf-8'))
+
+
+def _split_oversized_sentence(sentence, max_bytes, use_ssml):
+    """
+    Divide uma frase maior que `max_bytes` em pedaços menores, preferindo
+    fronteiras de oração (vírgula, ponto e vírgula, dois-pontos, travessão),
+    depois fronteiras de palavra e, em último caso, cortando por caracteres.
+    """
+    pieces = []
+    for clause in _CLAUSE_BOUNDARY.split(sentence):
+        if _byte_len(clause, use_ssml) <= max_bytes:
+            pieces.append(clause)
+            continue
+        current = ""
+        for word in clause.split():
+            candidate = f"{current} {word}" if current else word
+            if _byte_len(candidate, use_ssml) <= max_bytes:
+                current = candidate
+                continue
+            if current:
+                pieces.append(current)
+            # Palavra isolada maior que o limite (ex.: URL ou tabela sem espaços): corta por caracteres.
+            while _byte_len(word, use_ssml) > max_bytes:
+                cut = len(word)
+                while _byte_len(word[:cut], use_ssml) > max_bytes:
+                    cut = cut * max_bytes // _byte_len(word[:cut], use_ssml) or cut - 1
+                pieces.append(word[:cut])
+                word = word[cut:]
+            current = word
+        if current:
+            pieces.append(current)
+    return [piece for piece in pieces if piece.strip()]
+
+
+def plan_tts_chunks(sentences, max_bytes=TTS_MAX_REQUEST_BYTES, use_ssml=False, break_ms=TTS_SENTENCE_BREAK_MS):
+    """
+    Agrupa frases consecutivas em chunks o mais próximos possível de `max_bytes`
+    (medidos em UTF-8, já contando a marcação SSML quando `use_ssml` estiver ativo).
+    Frases que sozinhas excedem o limite são divididas antes do agrupamento.
 
-def convert_text_to_speech(text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E'):
+    Returns:
+        list[TtsChunk]: Os chunks na ordem original do texto.
+    """
+    separator = f'<break time="{break_ms}ms"/>' if use_ssml else " "
+    wrapper_bytes = len("<speak></speak>") if use_ssml else 0
+    separator_bytes = len(separator.encode('utf-8'))
+    budget = max_bytes - wrapper_bytes
+
+    pieces = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if _byte_len(sentence, use_ssml) > budget:
+            pieces.extend(_split_oversized_sentence(sentence, budget, use_ssml))
+        else:
+            pieces.append(sentence)
+
+    groups = []
+    current, current_bytes = [], 0
+    for piece in pieces:
+        piece_bytes = _byte_len(piece, use_ssml)
+        needed = piece_bytes + (separator_bytes if current else 0)
+        if current and current_bytes + needed > budget:
+            groups.append(current)
+            current, current_bytes = [], 0
+            needed = piece_bytes
+        current.append(piece)
+        current_bytes += needed
+    if current:
+        groups.append(current)
+
+    if use_ssml:
+        return [TtsChunk(f"<speak>{separator.join(xml_escape(p) for p in group)}</speak>", True) for group in groups]
+    return [TtsChunk(separator.join(group), False) for group in groups]
+
+
+def _texttospeech():
+    """Importa a biblioteca do Google TTS só no primeiro uso (a importação é lenta)."""
+    from google.cloud import texttospeech
+    return texttospeech
+
+
+_tts_client = None
+_tts_client_lock = threading.Lock()
+
+
+def get_tts_client():
+    """
+    Retorna o TextToSpeechClient compartilhado, criando-o (e carregando as credenciais
+    de KEY_FILE_PATH) apenas na primeira chamada. Processos de longa duração, como o
+    watcher, reaproveitam o mesmo cliente e seu canal gRPC entre boletins.
+    """
+    global _tts_client
+    with _tts_client_lock:
+        if _tts_client is None:
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_file(KEY_FILE_PATH)
+            _tts_client = _texttospeech().TextToSpeechClient(credentials=credentials)
+        return _tts_client
+
+
+# Cache compartilhado de chunks de áudio já sintetizados (ver audio_cache.py). Os chunks ficam
+# no encoding pedido à API: PCM nos perfis com re-encode, por isso o limite padrão é maior.
+_CACHED_ENCODING = (_ENCODED_PROFILES[TTS_AUDIO_PROFILE].api_encoding if TTS_AUDIO_PROFILE in _ENCODED_PROFILES
+                    else TTS_AUDIO_ENCODING)
+_audio_cache = AudioCache(max_bytes=cache_max_bytes(_CACHED_ENCODING)) if TTS_CACHE_ENABLED else None
+
+
+class _RateLimiter:
+    """Espaça o início das requisições para respeitar um limite de requisições por segundo."""
+
+    def __init__(self, max_per_second):
+        self._interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Compartilhados por todas as conversões do processo (ver TTS_MAX_IN_FLIGHT).
+_rate_limiter = _RateLimiter(TTS_MAX_REQUESTS_PER_SECOND)
+_in_flight = threading.BoundedSemaphore(max(1, TTS_MAX_IN_FLIGHT))
+
+
+def _strip_id3v2(data):
+    """Remove uma eventual tag ID3v2 do início de um chunk MP3, deixando só os frames de áudio."""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        # O tamanho da tag é um inteiro "syncsafe" de 4 bytes (7 bits úteis por byte).
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return data[10 + size + footer:]
+    return data
+
+
+class _AudioFileWriter:
+    """
+    Escreve os chunks de áudio no arquivo final à medida que chegam, em uma única passada.
+
+    - MP3: os frames são anexados diretamente (MP3 é uma sequência de frames independentes).
+    - OGG_OPUS: os streams são encadeados (Ogg "chained streams", suportado pelos players).
+    - LINEAR16: a API devolve WAV; só as amostras PCM são copiadas para um único WAV.
+
+    O arquivo é escrito em `<destino>.part` e renomeado ao final, para que uma falha
+    no meio do processo nunca deixe um áudio truncado no caminho de destino.
+    """
+
+    def __init__(self, path, audio_encoding):
+        self.path = path
+        self.audio_encoding = audio_encoding
+        self._part_path = f"{path}.part"
+        self._file = open(self._part_path, "wb")
+        self._wav = None
+
+    def append(self, audio_content):
+        if self.audio_encoding == "LINEAR16":
+            with wave.open(io.BytesIO(audio_content), "rb") as chunk:
+                if self._wav is None:
+                    self._wav = wave.open(self._file, "wb")
+                    self._wav.setparams(chunk.getparams())
+                self._wav.writeframes(chunk.readframes(chunk.getnframes()))
+        elif self.audio_encoding == "MP3":
+            self._file.write(_strip_id3v2(audio_content))
+        else:
+            self._file.write(audio_content)
+
+    def commit(self):
+        if self._wav is not None:
+            self._wav.close()  # Atualiza o cabeçalho RIFF com o total de amostras.
+        self._file.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        if self._wav is not None:
+            try:
+                self._wav.close()
+            except Exception:
+                pass
+        self._file.close()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
+
+
+def get_audio_profile(profile_name=None):
+    """
+    Resolve o perfil de saída (padrão TTS_AUDIO_PROFILE). Perfis com re-encode caem para
+    "passthrough" quando o ffmpeg não está instalado.
+
+    Returns:
+        AudioProfile
+    """
+    profile_name = (profile_name or TTS_AUDIO_PROFILE).lower()
+    passthrough_encoding = TTS_AUDIO_ENCODING if TTS_AUDIO_ENCODING in _AUDIO_EXTENSIONS else "MP3"
+    passthrough = AudioProfile(passthrough_encoding, _AUDIO_EXTENSIONS[passthrough_encoding], None)
+    if profile_name == "passthrough":
+        if TTS_LOUDNORM:
+            print("Aviso: TTS_LOUDNORM é ignorado no perfil 'passthrough' (não há re-encode).")
+        return passthrough
+    if profile_name not in _ENCODED_PROFILES:
+        print(f"Aviso: TTS_AUDIO_PROFILE '{profile_name}' desconhecido; usando 'passthrough'.")
+        return passthrough
+    if shutil.which("ffmpeg") is None:
+        print(f"Aviso: ffmpeg não encontrado; o perfil '{profile_name}' foi trocado por 'passthrough'.")
+        return passthrough
+    return _ENCODED_PROFILES[profile_name]
+
+
+class _FfmpegEncoder:
+    """
+    Codifica os chunks LINEAR16 (WAV) com o ffmpeg em uma única passada, à medida que chegam:
+    as amostras PCM vão direto para o stdin do ffmpeg, que grava `<destino>.part`
+    (renomeado no commit, como em _AudioFileWriter). O filtro de loudness, se houver,
+    é aplicado nessa mesma passada.
+    """
+
+    def __init__(self, path, codec_args, audio_filter=None):
+        self.path = path
+        self._codec_args = codec_args
+        self._audio_filter = audio_filter
+        self._part_path = f"{path}.part"
+        self._process = None
+
+    def _start(self, params):
+        if params.sampwidth != 2:
+            raise ValueError(f"Áudio LINEAR16 inesperado ({params.sampwidth * 8} bits por amostra).")
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                   "-f", "s16le", "-ar", str(params.framerate), "-ac", str(params.nchannels), "-i", "pipe:0"]
+        if self._audio_filter:
+            command += ["-af", self._audio_filter]
+        command += ["-ac", "1", *self._codec_args, self._part_path]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def append(self, audio_content):
+        with wave.open(io.BytesIO(audio_content), "rb") as chunk:
+            if self._process is None:
+                self._start(chunk.getparams())
+            self._process.stdin.write(chunk.readframes(chunk.getnframes()))
+
+    def commit(self):
+        if self._process is None:
+            raise RuntimeError("Nenhum áudio recebido para codificar.")
+        self._process.stdin.close()
+        stderr = self._process.stderr.read()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg falhou: {stderr.decode('utf-8', 'replace').strip()}")
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
+
+
+def _open_audio_writer(path, profile):
+    if profile.ffmpeg_codec_args is None:
+        return _AudioFileWriter(path, profile.api_encoding)
+    return _FfmpegEncoder(path, profile.ffmpeg_codec_args, TTS_LOUDNORM_FILTER if TTS_LOUDNORM else None)
+
+
+def _synthesize_chunk(client, index, total, chunk, voice, audio_config, deadline):
+    """
+    Sintetiza um único TtsChunk e retorna os bytes de áudio.
+    Falhas transitórias (cota/indisponibilidade) são repetidas só para este chunk,
+    com backoff, dentro do prazo global `deadline` da conversão (ver retry_policy.py).
+    """
+    texttospeech = _texttospeech()
+    if chunk.is_ssml:
+        synthesis_input = texttospeech.SynthesisInput(ssml=chunk.content)
+    else:
+        synthesis_input = texttospeech.SynthesisInput(text=chunk.content)
+
+    def request():
+        # A vaga é liberada entre as tentativas, para que o backoff de um chunk não segure as outras conversões.
+        if not _in_flight.acquire(timeout=max(0.0, deadline.remaining())):
+            raise TimeoutError(f"Prazo esgotado aguardando vaga para o chunk {index+1}/{total} (TTS_MAX_IN_FLIGHT).")
+        try:
+            _rate_limiter.wait()
+            print(f"  -> Enviando chunk {index+1}/{total} ({len(chunk.content.encode('utf-8'))} bytes) para a API TTS...")
+            metrics.inc("tts_requests")
+            return metrics.timed_call(
+                "tts_request_seconds",
+                client.synthesize_speech,
+                request={
+                    "input": synthesis_input,
+                    "voice": voice,
+                    "audio_config": audio_config,
+                },
+                timeout=max(1.0, deadline.remaining()),
+            )
+        finally:
+            _in_flight.release()
+
+    response = call_with_retry(request, description=f"TTS do chunk {index+1}/{total}", deadline=deadline)
+    metrics.inc("tts_bytes_in", len(chunk.content.encode('utf-8')))
+    metrics.inc("tts_audio_bytes_out", len(response.audio_content))
+    return response.audio_content
+
+
+def convert_text_to_speech(text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E', max_workers=None, use_ssml=None,
+                           client=None, output_path=None, audio_profile=None):
     """
     Converte texto em áudio usando a API Google Cloud Text-to-Speech.
-    Divide o texto em frases para respeitar o limite de 5000 bytes da API,
-    e concatena os arquivos de áudio resultantes.
+    Divide o texto em frases e as agrupa em chunks próximos ao limite de 5000 bytes
+    da API (ver plan_tts_chunks; `use_ssml` padrão TTS_USE_SSML), sintetiza os chunks
+    em paralelo (até `max_workers` requisições simultâneas, padrão TTS_MAX_WORKERS)
+    e grava os áudios resultantes, na ordem original, direto no arquivo final.
+    Se `client` não for informado, usa o cliente compartilhado de get_tts_client().
+    Se `output_path` não for informado, o áudio é gravado em AUDIO_FILE_PATH ou, se ele não
+    estiver definido, em um arquivo com nome único em WORKSPACE_BASE_DIR; em ambos os casos
+    a extensão é ajustada conforme o perfil de áudio (`audio_profile` ou TTS_AUDIO_PROFILE)
+    e o caminho final é retornado. Remover o arquivo fica a cargo de quem chama.
     """
+    if max_workers is None:
+        max_workers = TTS_MAX_WORKERS
+    max_workers = max(1, max_workers)
+    if use_ssml is None:
+        use_ssml = TTS_USE_SSML
     print(f"--- Iniciando Text-to-Speech (Google Cloud) para idioma: {lang_code}, voz: {voice_name} ---")
     print(f"Caminho da chave de serviço (KEY_FILE_PATH): {KEY_FILE_PATH}")
-    print(f"Caminho do arquivo de áudio final (AUDIO_FILE_PATH): {AUDIO_FILE_PATH}")
-    print(f"Diretório temporário para áudio: {TEMP_AUDIO_DIR}")
+    if not output_path:
+        output_path = AUDIO_FILE_PATH or os.path.join(workspace_base_dir(), f"opin_audio_{uuid.uuid4().hex}.mp3")
 
     if not text:
         print("Erro: Nenhum texto fornecido para conversão TTS.")
@@ -51,86 +444,88 @@ def convert_text_to_speech(text, lang_code='pt-BR', voice_name='pt-BR-Wavenet-E'
         # Tenta carregar as credenciais do arquivo especificado.
         # Se a variável GOOGLE_APPLICATION_CREDENTIALS estiver definida e o arquivo existir,
         # o cliente pode se autenticar automaticamente.
-        credentials = service_account.Credentials.from_service_account_file(KEY_FILE_PATH)
-        client = texttospeech.TextToSpeechClient(credentials=credentials)
+        if client is None:
+            client = get_tts_client()
     except Exception as e:
         print(f"Erro ao carregar credenciais do Google Cloud a partir de '{KEY_FILE_PATH}': {e}")
         print("Certifique-se de que KEY_FILE_PATH está correto e que o arquivo JSON existe e é acessível.")
         return None
 
-    # --- NOVO: Dividir o texto em frases para evitar o limite de 5000 bytes ---
-    # Garante que o tokenizador 'punkt' do NLTK esteja baixado.
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        print("Tokenizador 'punkt' do NLTK não encontrado. Baixando...")
-        nltk.download('punkt')
-        print("Tokenizador 'punkt' do NLTK baixado.")
-
-    sentences = sent_tokenize(text, language='portuguese')
-    
-    temp_audio_files = []
-    # Cria o diretório temporário se ele não existir
-    os.makedirs(TEMP_AUDIO_DIR, exist_ok=True)
+    # --- Dividir o texto em frases e agrupá-las respeitando o limite de 5000 bytes ---
+    # O tokenizador do NLTK é resolvido uma única vez a partir de NLTK_DATA, sem downloads (ver nlp_setup.py).
+    sentences = split_sentences(text, language='portuguese')
+    chunks = plan_tts_chunks(sentences, use_ssml=use_ssml)
+    print(f"  -> {len(sentences)} frases agrupadas em {len(chunks)} requisições TTS.")
+
+    texttospeech = _texttospeech()
+    voice = texttospeech.VoiceSelectionParams(
+        language_code=lang_code,
+        name=voice_name,
+        ssml_gender=texttospeech.SsmlVoiceGender.FEMALE # Você pode ajustar para MALE ou NEUTRAL
+    )
+    profile = get_audio_profile(audio_profile)
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=getattr(texttospeech.AudioEncoding, profile.api_encoding),
+        speaking_rate=TTS_SPEAKING_RATE,
+        sample_rate_hertz=TTS_SAMPLE_RATE_HERTZ,
+        effects_profile_id=TTS_EFFECTS_PROFILE_ID,
+    )
+    # Só entra na chave do cache quando difere do padrão, preservando as entradas existentes.
+    audio_params = ""
+    if TTS_SPEAKING_RATE != 1.0 or TTS_SAMPLE_RATE_HERTZ or TTS_EFFECTS_PROFILE_ID:
+        audio_params = f"{TTS_SPEAKING_RATE}:{TTS_SAMPLE_RATE_HERTZ}:{','.join(TTS_EFFECTS_PROFILE_ID)}"
+    output_path = os.path.splitext(output_path)[0] + profile.extension
+    print(f"Caminho do arquivo de áudio final: {output_path}")
+    deadline = Deadline()
+    total = len(chunks)
+
+    def synthesize(item):
+        index, chunk = item
+        if _audio_cache is None:
+            return _synthesize_chunk(client, index, total, chunk, voice, audio_config, deadline)
+        cache_key = make_cache_key(chunk.content, chunk.is_ssml, lang_code, voice_name, audio_config.audio_encoding,
+                                   audio_params)
+        audio_content = _audio_cache.get(cache_key)
+        if audio_content is not None:
+            print(f"  -> Chunk {index+1}/{total} encontrado no cache de áudio.")
+            metrics.inc("tts_cache_hits")
+            return audio_content
+        metrics.inc("tts_cache_misses")
+        audio_content = _synthesize_chunk(client, index, total, chunk, voice, audio_config, deadline)
+        _audio_cache.put(cache_key, audio_content)
+        return audio_content
+
+    # Garante que o diretório de destino do arquivo de áudio final exista
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    writer = _open_audio_writer(output_path, profile)
 
     try:
-        for i, sentence in enumerate(sentences):
-            # A API Google TTS tem um limite de 5000 bytes UTF-8 por solicitação.
-            # sent_tokenize geralmente gera chunks menores, mas é bom ter uma verificação.
-            sentence_bytes = sentence.encode('utf-8')
-            if len(sentence_bytes) > 4900: # Deixa uma pequena margem de segurança
-                print(f"Aviso: A frase {i+1} é muito longa ({len(sentence_bytes)} bytes). "
-                      "Isso ainda pode causar um erro se não for dividida ainda mais.")
-
-            synthesis_input = texttospeech.SynthesisInput(text=sentence)
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=lang_code,
-                name=voice_name,
-                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE # Você pode ajustar para MALE ou NEUTRAL
-            )
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3
-            )
+        # Os resultados são lidos na ordem de envio, então o áudio final segue a ordem do texto
+        # mesmo que as respostas da API cheguem fora de ordem. Cada chunk é anexado ao arquivo
+        # final assim que fica disponível, sem arquivos temporários nem re-codificação.
+        # No máximo 2 * max_workers chunks ficam em andamento (ou prontos aguardando a vez),
+        # então a memória não cresce com o tamanho do texto quando um chunk atrasa.
+        print(f"  -> Sintetizando {total} chunks com até {max_workers} requisições simultâneas...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for item in enumerate(chunks):
+                # submit_in_context faz as métricas de cada requisição contarem para a execução atual.
+                pending.append(metrics.submit_in_context(executor, synthesize, item))
+                if len(pending) >= 2 * max_workers:
+                    writer.append(pending.popleft().result())
+            while pending:
+                writer.append(pending.popleft().result())
 
-            print(f"  -> Enviando chunk {i+1}/{len(sentences)} para a API TTS...")
-            response = client.synthesize_speech(
-                request={"input": synthesis_input, "voice": voice, "audio_config": audio_config}
-            )
+        if _audio_cache is not None:
+            stats = _audio_cache.stats()
+            print(f"  -> Cache de áudio: {stats['hits']} acertos, {stats['misses']} falhas (acumulado).")
 
-            # Salva o chunk de áudio em um arquivo temporário único
-            temp_filename = os.path.join(TEMP_AUDIO_DIR, f"temp_audio_chunk_{uuid.uuid4()}.mp3")
-            with open(temp_filename, "wb") as out:
-                out.write(response.audio_content)
-            temp_audio_files.append(temp_filename)
-            
-        print("  -> Todos os chunks processados. Concatenando arquivos de áudio...")
-        
-        # Concatena todos os arquivos de áudio temporários em um único arquivo
-        final_audio = AudioSegment.empty()
-        for f in temp_audio_files:
-            final_audio += AudioSegment.from_file(f, format="mp3")
-
-        # Garante que o diretório de destino do arquivo de áudio final exista
-        os.makedirs(os.path.dirname(AUDIO_FILE_PATH), exist_ok=True)
-        final_audio.export(AUDIO_FILE_PATH, format="mp3")
-        
-        print(f"Conteúdo de áudio salvo em '{AUDIO_FILE_PATH}'")
-        return AUDIO_FILE_PATH
+        writer.commit()
+        print(f"Conteúdo de áudio salvo em '{output_path}'")
+        return output_path
 
     except Exception as e:
+        writer.abort()
         print(f"Erro durante a conversão Google Cloud Text-to-Speech: {e}")
         return None
-    finally:
-        # --- Limpeza dos arquivos temporários ---
-        print(f"  -> Limpando arquivos de áudio temporários em '{TEMP_AUDIO_DIR}'...")
-        for f in temp_audio_files:
-            if os.path.exists(f):
-                os.remove(f)
-        # Tenta remover o diretório temporário se estiver vazio
-        try:
-            if os.path.exists(TEMP_AUDIO_DIR) and not os.listdir(TEMP_AUDIO_DIR):
-                os.rmdir(TEMP_AUDIO_DIR)
-        except OSError as e:
-            print(f"Aviso: Não foi possível remover o diretório temporário '{TEMP_AUDIO_DIR}': {e}")
-        print("  -> Limpeza concluída.")
 
@@ -0,0 +1,111 @@
+import os
+import math
+import re
+from collections import namedtuple
+
+from nlp_setup import split_sentences_simple
+from text_to_speech import TTS_MAX_REQUEST_BYTES
+
+# Budgets applied to the text sent to TTS. They protect latency and cost when the
+# summarizer fails and hands back the full bulletin text.
+TTS_BUDGET_MAX_CHARS = int(os.getenv("TTS_BUDGET_MAX_CHARS", "12000"))
+TTS_BUDGET_MAX_REQUESTS = int(os.getenv("TTS_BUDGET_MAX_REQUESTS", "10"))
+TTS_BUDGET_MAX_AUDIO_SECONDS = int(os.getenv("TTS_BUDGET_MAX_AUDIO_SECONDS", "600"))
+
+# Rough Portuguese speaking rate used to estimate audio duration from text length.
+SPOKEN_CHARS_PER_SECOND = 15.0
+
+# Number of lead sentences and section headings used by the cheap fallback summary.
+FALLBACK_LEAD_SENTENCES = int(os.getenv("FALLBACK_LEAD_SENTENCES", "7"))
+FALLBACK_MAX_HEADINGS = int(os.getenv("FALLBACK_MAX_HEADINGS", "8"))
+
+# Which path produced the speech text:
+# - "summary": the summarizer output, within budget
+# - "lead-fallback": summarizer failed or went over budget; headings + lead sentences used instead
+# - "truncated": even the fallback was over budget and was cut at a sentence boundary
+BudgetResult = namedtuple("BudgetResult", ["text", "path", "reason"])
+
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*[.)]?|[IVX]+[.)])\s+\S")
+
+
+def estimate_cost(text):
+    """Returns (chars, estimated TTS requests, estimated audio seconds) for `text`."""
+    chars = len(text)
+    requests = math.ceil(len(text.encode("utf-8")) / TTS_MAX_REQUEST_BYTES)
+    seconds = chars / SPOKEN_CHARS_PER_SECOND
+    return chars, requests, seconds
+
+
+def _over_budget(text):
+    chars, requests, seconds = estimate_cost(text)
+    if chars > TTS_BUDGET_MAX_CHARS:
+        return f"{chars} chars > {TTS_BUDGET_MAX_CHARS}"
+    if requests > TTS_BUDGET_MAX_REQUESTS:
+        return f"~{requests} TTS requests > {TTS_BUDGET_MAX_REQUESTS}"
+    if seconds > TTS_BUDGET_MAX_AUDIO_SECONDS:
+        return f"~{seconds:.0f}s of audio > {TTS_BUDGET_MAX_AUDIO_SECONDS}s"
+    return None
+
+
+def _is_heading(line):
+    if not 3 <= len(line) <= 80 or line.endswith((".", ",", ";", ":")):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if not letters:
+        return False
+    mostly_upper = sum(c.isupper() for c in letters) / len(letters) > 0.7
+    return mostly_upper or bool(_NUMBERED_HEADING.match(line))
+
+
+def lead_summary(text):
+    """Cheap extractive fallback: the first section headings followed by the lead sentences."""
+    headings = []
+    for line in text.splitlines():
+        line = line.strip()
+        if _is_heading(line) and line not in headings:
+            headings.append(line)
+            if len(headings) >= FALLBACK_MAX_HEADINGS:
+                break
+
+    sentences = split_sentences_simple(text)[:FALLBACK_LEAD_SENTENCES]
+    parts = [f"{h.rstrip('.')}." for h in headings] + sentences
+    return " ".join(parts)
+
+
+def _truncate_to_budget(text):
+    limit = min(
+        TTS_BUDGET_MAX_CHARS,
+        int(TTS_BUDGET_MAX_AUDIO_SECONDS * SPOKEN_CHARS_PER_SECOND),
+        TTS_BUDGET_MAX_REQUESTS * TTS_MAX_REQUEST_BYTES // 2,  # Worst case: 2 UTF-8 bytes per char.
+    )
+    if len(text) <= limit:
+        return text
+    cut = max(text.rfind(". ", 0, limit), text.rfind("! ", 0, limit), text.rfind("? ", 0, limit))
+    return text[:cut + 1] if cut > 0 else text[:limit]
+
+
+def apply_tts_budget(summary_text, source_text):
+    """
+    Makes sure the text handed to TTS stays within the configured budgets.
+
+    Args:
+        summary_text (str): Output of the summarizer (may be the full source text on failure).
+        source_text (str): The text extracted from the PDF.
+
+    Returns:
+        BudgetResult: The text to synthesize, which path produced it and why.
+    """
+    summary_failed = not summary_text or summary_text == source_text
+    over = None if summary_failed else _over_budget(summary_text)
+    if not summary_failed and not over:
+        return BudgetResult(summary_text, "summary", "within budget")
+
+    reason = "summarizer returned the full text" if summary_failed else f"summary over budget ({over})"
+    print(f"Warning: {reason}; using headings + lead sentences instead.")
+    fallback = lead_summary(source_text)
+    over = _over_budget(fallback)
+    if not over:
+        return BudgetResult(fallback, "lead-fallback", reason)
+
+    print(f"Warning: fallback summary still over budget ({over}); truncating.")
+    return BudgetResult(_truncate_to_budget(fallback), "truncated", f"{reason}; fallback over budget ({over})")
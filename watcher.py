@@ -0,0 +1,183 @@
+import os
+import re
+import shutil
+import sys
+import time
+
+from main import process_bulletin, check_slack_token
+from text_to_speech import get_tts_client
+from slack_sender import get_slack_client
+from summarize_text import get_summarizer
+from workspace import remove_stale_workspaces, exit_on_sigterm
+
+# Directory watched for new bulletins; processed files are moved to
+# <inbox>/processed or <inbox>/failed so they are never picked up twice.
+WATCH_INBOX_DIR = os.getenv("WATCH_INBOX_DIR", "/app/input")
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "5"))
+
+# Seconds a file's size must stay unchanged before it is considered fully copied
+# (only used by the polling fallback; inotify reports IN_CLOSE_WRITE/IN_MOVED_TO).
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "2"))
+
+# Bulletins left in the inbox (claimed by another worker in the publish ledger, or that could
+# not be moved) are retried after this many seconds.
+WATCH_RETRY_SECONDS = float(os.getenv("WATCH_RETRY_SECONDS", "60"))
+
+# Same naming schemes understood by main.get_bulletin_number_from_filepath:
+# B<YY>-<NNN>.pdf and D<YY>-<NNN>-<NNN>.pdf
+BULLETIN_FILENAME_PATTERN = re.compile(r"^[BD]\d{2}-\d{3}(-\d{3})?\.pdf$", re.IGNORECASE)
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Not available outside Linux; watch() falls back to polling.
+    INotify = None
+
+
+def is_bulletin_file(filename):
+    return bool(BULLETIN_FILENAME_PATTERN.match(filename))
+
+
+def warm_up():
+    """Creates the TTS/Slack clients and the summarizer once, before the first job arrives."""
+    print("--- Warming up TTS client, Slack client, tokenizer and summarizer ---")
+    try:
+        get_tts_client()
+    except Exception as e:
+        print(f"Warning: could not create the TTS client yet ({e}); it will be retried on first use.")
+    get_slack_client()
+    get_summarizer()
+    removed = remove_stale_workspaces()
+    if removed:
+        print(f"Removed {removed} job workspace(s) left behind by earlier runs.")
+
+
+def _move_to(pdf_filepath, subdir):
+    target_dir = os.path.join(os.path.dirname(pdf_filepath), subdir)
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, os.path.basename(pdf_filepath))
+    shutil.move(pdf_filepath, target)
+    return target
+
+
+def handle_file(pdf_filepath):
+    """
+    Runs the pipeline on one bulletin and files it under processed/ or failed/.
+
+    Returns:
+        bool: False when the file was left in the inbox to be retried later: another
+        worker holds its publish ledger claim (and may still be reading it), or it
+        could not be moved.
+    """
+    print(f"\n=== New bulletin detected: {pdf_filepath} ===")
+    try:
+        success = process_bulletin(pdf_filepath)
+    except Exception as e:
+        print(f"Error: unexpected failure while processing {pdf_filepath}: {e}")
+        success = False
+    if success is None:
+        print(f"=== {os.path.basename(pdf_filepath)} is being processed by another worker; "
+              f"retrying in {WATCH_RETRY_SECONDS:.0f}s ===")
+        return False
+    try:
+        destination = _move_to(pdf_filepath, "processed" if success else "failed")
+    except OSError as e:
+        print(f"Error: could not move {pdf_filepath} out of the inbox ({e}); retrying in {WATCH_RETRY_SECONDS:.0f}s.")
+        return False
+    print(f"=== Finished {os.path.basename(pdf_filepath)} ({'ok' if success else 'failed'}), moved to {destination} ===")
+    return True
+
+
+def _handle(pdf_filepath, retry_at):
+    if handle_file(pdf_filepath):
+        retry_at.pop(pdf_filepath, None)
+    else:
+        retry_at[pdf_filepath] = time.monotonic() + WATCH_RETRY_SECONDS
+
+
+def _retry_due(retry_at):
+    now = time.monotonic()
+    for pdf_filepath, due in list(retry_at.items()):
+        if due <= now:
+            if os.path.isfile(pdf_filepath):
+                _handle(pdf_filepath, retry_at)
+            else:
+                retry_at.pop(pdf_filepath)
+
+
+def _pending_files(inbox_dir):
+    return sorted(
+        os.path.join(inbox_dir, name)
+        for name in os.listdir(inbox_dir)
+        if is_bulletin_file(name) and os.path.isfile(os.path.join(inbox_dir, name))
+    )
+
+
+def _watch_inotify(inbox_dir, poll_interval, retry_at):
+    inotify = INotify()
+    inotify.add_watch(inbox_dir, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+    print(f"Watching {inbox_dir} with inotify...")
+    while True:
+        # The timeout lets deferred files be retried even when no new file arrives.
+        for event in inotify.read(timeout=int(poll_interval * 1000)):
+            if is_bulletin_file(event.name):
+                pdf_filepath = os.path.join(inbox_dir, event.name)
+                if os.path.isfile(pdf_filepath):
+                    _handle(pdf_filepath, retry_at)
+        _retry_due(retry_at)
+
+
+def _watch_polling(inbox_dir, poll_interval, retry_at):
+    print(f"Watching {inbox_dir} by polling every {poll_interval}s...")
+    sizes = {}
+    while True:
+        for pdf_filepath in _pending_files(inbox_dir):
+            if pdf_filepath in retry_at:
+                continue  # Retried by _retry_due.
+            try:
+                size = os.path.getsize(pdf_filepath)
+            except OSError:
+                continue
+            previous = sizes.get(pdf_filepath)
+            if previous is None or previous[0] != size:
+                sizes[pdf_filepath] = (size, time.monotonic())
+                continue
+            if time.monotonic() - previous[1] >= WATCH_SETTLE_SECONDS:
+                sizes.pop(pdf_filepath)
+                _handle(pdf_filepath, retry_at)
+        _retry_due(retry_at)
+        time.sleep(poll_interval)
+
+
+def watch(inbox_dir=WATCH_INBOX_DIR, poll_interval=WATCH_POLL_INTERVAL):
+    """
+    Processes bulletins dropped into `inbox_dir` until interrupted.
+
+    Files already present at startup are handled first. Uses inotify through
+    `inotify_simple` (in requirements.txt, Linux only); without it, warns and polls
+    the directory.
+    """
+    os.makedirs(inbox_dir, exist_ok=True)
+    warm_up()
+
+    retry_at = {}  # File -> time.monotonic() of its next attempt, for files left in the inbox.
+    for pdf_filepath in _pending_files(inbox_dir):
+        _handle(pdf_filepath, retry_at)
+
+    if INotify is not None:
+        _watch_inotify(inbox_dir, poll_interval, retry_at)
+    else:
+        print(f"Warning: inotify_simple is not installed (see requirements.txt); "
+              f"polling {inbox_dir} every {poll_interval}s instead.")
+        _watch_polling(inbox_dir, poll_interval, retry_at)
+
+
+if __name__ == "__main__":
+    print("--- Iniciando Open Insurance Slack Bot (modo watcher) ---")
+    if not check_slack_token():
+        sys.exit(1)
+    inbox = sys.argv[1] if len(sys.argv) > 1 else WATCH_INBOX_DIR
+    exit_on_sigterm()
+    try:
+        watch(inbox)
+    except KeyboardInterrupt:
+        print("\nWatcher interrompido. Saindo.")
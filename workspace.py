@@ -0,0 +1,73 @@
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+# Parent directory of the per-job scratch directories (default: the system temp dir).
+# Point it at a tmpfs such as /dev/shm to keep intermediate audio off the disk.
+WORKSPACE_BASE_DIR = os.getenv("WORKSPACE_BASE_DIR", "")
+
+# Job directories left behind by killed processes are removed after this many seconds.
+WORKSPACE_STALE_SECONDS = int(os.getenv("WORKSPACE_STALE_SECONDS", str(6 * 60 * 60)))
+
+_PREFIX = "opin_job_"
+
+
+def workspace_base_dir():
+    return WORKSPACE_BASE_DIR or tempfile.gettempdir()
+
+
+class JobWorkspace:
+    """
+    Private scratch directory for one job, so concurrent runs and workers never share
+    output paths or delete each other's files.
+
+    Usable as a context manager (removed on exit, also on errors) or, when a job moves
+    between threads, by calling cleanup() explicitly; cleanup() is idempotent.
+    """
+
+    def __init__(self, name="job", base_dir=None):
+        base_dir = base_dir or workspace_base_dir()
+        os.makedirs(base_dir, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)[:40]
+        self.path = tempfile.mkdtemp(prefix=f"{_PREFIX}{safe_name}_", dir=base_dir)
+
+    def file(self, filename):
+        """Returns the path of `filename` inside the workspace."""
+        return os.path.join(self.path, filename)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+
+def remove_stale_workspaces(base_dir=None, max_age_seconds=None):
+    """Deletes job directories older than `max_age_seconds` (default WORKSPACE_STALE_SECONDS)."""
+    base_dir = base_dir or workspace_base_dir()
+    max_age_seconds = WORKSPACE_STALE_SECONDS if max_age_seconds is None else max_age_seconds
+    removed = 0
+    try:
+        entries = os.listdir(base_dir)
+    except OSError:
+        return 0
+    for name in entries:
+        path = os.path.join(base_dir, name)
+        try:
+            if name.startswith(_PREFIX) and time.time() - os.path.getmtime(path) > max_age_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def exit_on_sigterm():
+    """Turns SIGTERM (e.g. `docker stop`) into SystemExit, so workspaces are cleaned up on the way out."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))